@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+End-to-end tool benchmark for eClass MCP Server.
+
+Starts the mock eClass and CAS servers, points the MCP server at them and
+drives `handle_call_tool` for each tool under configurable concurrency,
+reporting p50/p95/p99 latency and throughput.
+
+Each concurrent worker acts as its own account, so workers never share a
+session. Before each timed call the worker puts its session in the state the
+tool needs (logged out before `login`, logged in before `logout`); that setup
+is not timed. `search` runs against an index filled by `get_courses` and
+`get_announcements` beforehand, and each `download_document` call fetches a
+document it has not downloaded before.
+
+Usage:
+    python benchmarks/bench_tools.py [--calls N] [--concurrency C]
+        [--courses N] [--latency MS] [--error-rate F] [--tools login,get_courses,...]
+        [--document-kb N]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mcp import types
+from mock_eclass import MockEClass
+
+TOOLS = ('login', 'get_courses', 'get_announcements', 'search', 'download_document', 'authstatus', 'logout')
+
+# Matches every announcement on the mock ("Ανακοίνωση N του CODE")
+SEARCH_QUERY = 'ανακοινωση'
+
+
+async def call(server, tool: str, account: str, **arguments: Any) -> Tuple[str, bool]:
+    """
+    Call a tool.
+    
+    Returns:
+        Tuple of (text of the first content block, whether the call failed)
+    """
+    result = await server.handle_call_tool(
+        tool, {'random_string': 'bench', 'account': account, **arguments}
+    )
+    # Structured output and timing metadata wrap the content in a CallToolResult
+    if isinstance(result, types.CallToolResult):
+        text = result.content[0].text
+        return text, result.isError or text.startswith('Error')
+    return result[0].text, result[0].text.startswith('Error')
+
+
+def arguments_for(tool: str, account: str, n: int) -> Dict[str, Any]:
+    """Arguments for the `n`-th timed call of `tool` by `account`."""
+    if tool == 'search':
+        return {'query': SEARCH_QUERY}
+    if tool == 'download_document':
+        # A new file each call, so the download is not served from the cache
+        return {'url': f"/modules/document/file.php/MOCK001/{account}-{n}.pdf"}
+    return {}
+
+
+async def run_tool(server, tool: str, accounts: List[str], calls: int) -> List[float]:
+    """Time `calls` calls of `tool` spread over one worker per account."""
+    latencies: List[float] = []
+    per_worker = [calls // len(accounts) + (i < calls % len(accounts)) for i in range(len(accounts))]
+    
+    async def worker(account: str, count: int) -> None:
+        for n in range(count):
+            if tool == 'login':
+                await call(server, 'logout', account)
+            elif tool == 'logout':
+                await call(server, 'login', account)
+            arguments = arguments_for(tool, account, n)
+            start = time.perf_counter()
+            text, failed = await call(server, tool, account, **arguments)
+            latencies.append(time.perf_counter() - start)
+            if failed:
+                raise RuntimeError(f"{tool} failed for {account}: {text}")
+    
+    await asyncio.gather(*(worker(a, n) for a, n in zip(accounts, per_worker)))
+    return latencies
+
+
+async def prepare_search(server, accounts: List[str]) -> None:
+    """Sync every account's courses and announcements into the search index."""
+    for step in ('get_courses', 'get_announcements'):
+        results = await asyncio.gather(*(call(server, step, a) for a in accounts))
+        for account, (text, failed) in zip(accounts, results):
+            if failed:
+                raise RuntimeError(f"{step} failed for {account} while preparing search: {text}")
+
+
+def percentile(samples: List[float], pct: int) -> float:
+    """Return the `pct`-th percentile of `samples`."""
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method='inclusive')[pct - 1]
+
+
+def report(tool: str, latencies: List[float], wall: float) -> Dict[str, float]:
+    """Summarize one tool's latencies in milliseconds."""
+    return {
+        'tool': tool,
+        'calls': len(latencies),
+        'p50': percentile(latencies, 50) * 1000,
+        'p95': percentile(latencies, 95) * 1000,
+        'p99': percentile(latencies, 99) * 1000,
+        'max': max(latencies) * 1000,
+        'throughput': len(latencies) / wall,
+    }
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, float]]:
+    """Run the benchmark against a fresh mock and return one row per tool."""
+    mock = MockEClass(
+        courses=args.courses,
+        latency=args.latency / 1000,
+        error_rate=args.error_rate,
+        document_size=args.document_kb * 1024,
+    )
+    data_dir = tempfile.mkdtemp(prefix='eclass-bench-')
+    accounts = [f"bench{i:03d}" for i in range(args.concurrency)]
+    accounts_file = os.path.join(data_dir, 'accounts.json')
+    with open(accounts_file, 'w', encoding='utf-8') as f:
+        json.dump({account: 'secret' for account in accounts}, f)
+    
+    os.environ.update(mock.env())
+    os.environ.update({
+        'ECLASS_ACCOUNTS_FILE': accounts_file,
+        'ECLASS_DATA_DIR': data_dir,
+        'ECLASS_PERSIST_SESSION': 'false',
+        'ECLASS_MAX_SESSIONS': str(max(args.concurrency, 1)),
+    })
+    from eclass_mcp_server import server
+    logging.getLogger('eclass_mcp_server').setLevel(logging.WARNING)
+    
+    rows = []
+    try:
+        for tool in args.tools:
+            # Steady state: everyone logged in before timing starts
+            await asyncio.gather(*(call(server, 'login', a) for a in accounts))
+            if tool == 'search':
+                await prepare_search(server, accounts)
+            start = time.perf_counter()
+            latencies = await run_tool(server, tool, accounts, args.calls)
+            rows.append(report(tool, latencies, time.perf_counter() - start))
+    finally:
+        mock.shutdown()
+    return rows
+
+
+def main() -> None:
+    """Parse options, run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description="End-to-end MCP tool benchmark")
+    parser.add_argument('--calls', type=int, default=200, help="Timed calls per tool")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent workers (accounts)")
+    parser.add_argument('--courses', type=int, default=12, help="Courses on the mock portfolio")
+    parser.add_argument('--latency', type=float, default=0.0, help="Mock per-request delay in ms")
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help="Fraction of mock GETs failing with a transient 502/503")
+    parser.add_argument('--document-kb', type=int, default=1024,
+                        help="Size of mock documents for download_document in KiB")
+    parser.add_argument('--tools', type=lambda s: s.split(','), default=list(TOOLS),
+                        help=f"Comma-separated tools (default: {','.join(TOOLS)})")
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = parser.parse_args()
+    
+    unknown = set(args.tools) - set(TOOLS)
+    if unknown:
+        parser.error(f"unknown tools: {', '.join(sorted(unknown))}")
+    
+    rows = asyncio.run(run(args))
+    
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    
+    print(f"\nconcurrency={args.concurrency} courses={args.courses} latency={args.latency}ms\n")
+    print(f"{'tool':<17} {'calls':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'calls/s':>9}")
+    for row in rows:
+        print(f"{row['tool']:<17} {row['calls']:>6} {row['p50']:>9.2f} {row['p95']:>9.2f} "
+              f"{row['p99']:>9.2f} {row['max']:>9.2f} {row['throughput']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,502 @@
+#!/usr/bin/env python3
+"""
+Mock eClass and CAS servers for local benchmarking.
+
+Serves just enough of Open eClass and UoA's CAS SSO for the MCP server's
+login, course listing and logout flows to run without the real systems:
+
+eClass host:
+    /main/login_form.php          Login page with the "ΕΚΠΑ" SSO button
+    /modules/auth/cas.php         Redirects to CAS, or redeems ?ticket=
+    /main/portfolio.php           Course list (redirects to login if expired)
+    /modules/announcements/index.php?course=CODE[&page=N]
+                                  Paginated announcements, newest first
+    /modules/document/file.php/CODE/NAME
+                                  Document download with Range and If-Range support
+    /index.php?logout=yes         Ends the session
+
+CAS host:
+    /cas/login                    GET: form with execution token; POST: ticket redirect
+
+Usage:
+    python benchmarks/mock_eclass.py [--courses N] [--announcements N] [--latency MS] [--port PORT]
+"""
+
+import argparse
+import hashlib
+import http.server
+import random
+import re
+import secrets
+import threading
+import time
+from http.cookies import SimpleCookie
+from typing import Dict, Optional
+from urllib.parse import parse_qs, quote, urlparse
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html lang="el"><head><meta charset="utf-8"><title>Σύνδεση | eClass</title></head>
+<body>
+<div class="container">
+  <h2>Σύνδεση</h2>
+  <a class="btn btn-primary" href="/modules/auth/cas.php">Είσοδος με λογαριασμό ΕΚΠΑ</a>
+  <form action="/index.php" method="post">
+    <input type="text" name="uname"><input type="password" name="pass">
+  </form>
+</div>
+</body></html>
+"""
+
+CAS_PAGE = """<!DOCTYPE html>
+<html lang="el"><head><meta charset="utf-8"><title>Κεντρική Υπηρεσία Πιστοποίησης</title></head>
+<body>
+<header><span>Πόροι Πληροφορικής ΕΚΠΑ</span></header>
+<form method="post" id="fm1" action="/cas/login?service={service}">
+  {message}
+  <input id="username" type="text" name="username" value="">
+  <input id="password" type="password" name="password" value="">
+  <input type="hidden" name="execution" value="{execution}"/>
+  <input type="hidden" name="_eventId" value="submit"/>
+  <button type="submit">ΣΥΝΔΕΣΗ</button>
+</form>
+</body></html>
+"""
+
+CAS_ERROR = """<div id="msg" class="alert alert-danger">
+    <span>The credentials you provided cannot be determined to be authentic.</span>
+  </div>"""
+
+PORTFOLIO_PAGE = """<!DOCTYPE html>
+<html lang="el"><head><meta charset="utf-8"><title>Χαρτοφυλάκιο χρήστη</title></head>
+<body>
+<div id="portfolio">
+  <h1>Τα μαθήματά μου</h1>
+{courses}
+</div>
+</body></html>
+"""
+
+COURSE_BOX = """  <div class="lesson panel">
+    <h3 class="course-title"><a href="/courses/{code}/">Μάθημα {index} <small>({code})</small></a></h3>
+    <ul class="list-inline">
+      <li><a href="/modules/announcements/index.php?course={code}">Ανακοινώσεις</a></li>
+      <li><a href="/modules/document/index.php?course={code}">Έγγραφα</a></li>
+    </ul>
+  </div>"""
+
+ANNOUNCEMENTS_PAGE = """<!DOCTYPE html>
+<html lang="el"><head><meta charset="utf-8"><title>Ανακοινώσεις | {code}</title></head>
+<body>
+<table id="ann_table{code}" class="table-default">
+  <thead><tr><th>Ανακοίνωση</th><th>Ημερομηνία</th></tr></thead>
+  <tbody>
+{rows}
+  </tbody>
+</table>
+{pagination}
+</body></html>
+"""
+
+ANNOUNCEMENT_ROW = """    <tr>
+      <td><a href="index.php?course={code}&amp;an_id={id}">Ανακοίνωση {id} του {code}</a></td>
+      <td class="date">{date}</td>
+    </tr>"""
+
+ANNOUNCEMENTS_NEXT = """<ul class="pagination"><li><a rel="next" href="index.php?course={code}&amp;page={page}">»</a></li></ul>"""
+
+ANNOUNCEMENTS_PER_PAGE = 10
+
+
+class MockState:
+    """Shared state of the mock eClass and CAS servers."""
+    
+    def __init__(
+        self,
+        courses: int = 12,
+        announcements: int = 15,
+        latency: float = 0.0,
+        document_size: int = 1024 * 1024,
+        session_lifetime: Optional[float] = None,
+        password: Optional[str] = None,
+        page_etags: bool = False,
+        error_rate: float = 0.0,
+    ) -> None:
+        """
+        Args:
+            courses: Number of courses on every portfolio page.
+            announcements: Initial number of announcements per course.
+            latency: Seconds to sleep before answering each request.
+            document_size: Size in bytes of every document.
+            session_lifetime: Seconds before an eClass session expires.
+            password: Accepted password; any password if None.
+            page_etags: Send ETags on HTML pages and answer If-None-Match
+                with 304. eClass itself sends no validators for its pages.
+            error_rate: Fraction of GET requests answered with a transient
+                502 or 503, as the university load balancer does.
+        """
+        self.courses = courses
+        self.initial_announcements = announcements
+        self.announcements: Dict[str, list] = {}
+        self._next_announcement_id = 1
+        self.latency = latency
+        self.document_size = document_size
+        # If set, the next document response is cut off after this many bytes
+        self.drop_download_after: Optional[int] = None
+        self.session_lifetime = session_lifetime
+        self.password = password
+        self.page_etags = page_etags
+        self.error_rate = error_rate
+        self.errors = 0
+        self.sessions: Dict[str, float] = {}
+        self.executions: set = set()
+        self.tickets: set = set()
+        self.requests = 0
+        self.lock = threading.Lock()
+    
+    def portfolio_html(self) -> str:
+        """Render a portfolio page with `courses` courses."""
+        boxes = "\n".join(
+            COURSE_BOX.format(index=i, code=f"MOCK{i:03d}") for i in range(1, self.courses + 1)
+        )
+        return PORTFOLIO_PAGE.format(courses=boxes)
+    
+    def add_announcement(self, code: str) -> int:
+        """Post a new announcement to a course and return its id."""
+        with self.lock:
+            ids = self._course_announcements(code)
+            announcement_id = self._next_announcement_id
+            self._next_announcement_id += 1
+            ids.insert(0, announcement_id)
+            return announcement_id
+    
+    def _course_announcements(self, code: str) -> list:
+        """Announcement ids of a course, newest first. Caller holds `lock`."""
+        if code not in self.announcements:
+            first = self._next_announcement_id
+            self._next_announcement_id += self.initial_announcements
+            self.announcements[code] = list(range(first + self.initial_announcements - 1, first - 1, -1))
+        return self.announcements[code]
+    
+    def announcements_html(self, code: str, page: int) -> str:
+        """Render one page of a course's announcements."""
+        with self.lock:
+            ids = list(self._course_announcements(code))
+        start = (page - 1) * ANNOUNCEMENTS_PER_PAGE
+        rows = "\n".join(
+            ANNOUNCEMENT_ROW.format(code=code, id=i, date=f"{1 + i % 28:02d}-10-2026")
+            for i in ids[start:start + ANNOUNCEMENTS_PER_PAGE]
+        )
+        more = start + ANNOUNCEMENTS_PER_PAGE < len(ids)
+        pagination = ANNOUNCEMENTS_NEXT.format(code=code, page=page + 1) if more else ""
+        return ANNOUNCEMENTS_PAGE.format(code=code, rows=rows, pagination=pagination)
+    
+    def document_bytes(self, path: str) -> bytes:
+        """
+        Deterministic content of the document at `path`.
+        
+        Content depends only on the file name, so a file of the same name in
+        several courses is identical, like a slide deck shared between them.
+        """
+        seed = hashlib.sha256(path.rsplit('/', 1)[-1].encode('utf-8')).digest()
+        return (seed * (self.document_size // len(seed) + 1))[:self.document_size]
+    
+    def session_valid(self, session_id: Optional[str]) -> bool:
+        """Check an eClass session id against the configured lifetime."""
+        with self.lock:
+            created = self.sessions.get(session_id or '')
+            if created is None:
+                return False
+            if self.session_lifetime is not None and time.monotonic() - created > self.session_lifetime:
+                del self.sessions[session_id]
+                return False
+            return True
+    
+    def expire_sessions(self) -> None:
+        """Invalidate every eClass session, as a server-side timeout would."""
+        with self.lock:
+            self.sessions.clear()
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    """Base handler: HTTP/1.1 keep-alive, artificial latency, quiet logs."""
+    
+    protocol_version = 'HTTP/1.1'
+    # Buffer headers and body into one write; separate small writes on a
+    # keep-alive connection hit the Nagle/delayed-ACK stall
+    wbufsize = -1
+    state: MockState
+    
+    def log_message(self, format: str, *args) -> None:
+        pass
+    
+    def _begin(self) -> None:
+        with self.state.lock:
+            self.state.requests += 1
+        if self.state.latency:
+            time.sleep(self.state.latency)
+    
+    def _transient_error(self) -> bool:
+        """Answer with a 502 or 503 at `error_rate`; True if it did."""
+        if not self.state.error_rate or random.random() >= self.state.error_rate:
+            return False
+        with self.state.lock:
+            self.state.errors += 1
+        if random.random() < 0.5:
+            self._send(502, 'Bad Gateway')
+        else:
+            self._send(503, 'Service Unavailable', {'Retry-After': '0'})
+        return True
+    
+    def _send(self, status: int, body: str = '', headers: Optional[Dict[str, str]] = None) -> None:
+        payload = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def _send_page(self, body: str) -> None:
+        """Send an HTML page, revalidated by ETag if `page_etags` is set."""
+        if not self.state.page_etags:
+            self._send(200, body)
+            return
+        digest = hashlib.sha256(body.encode('utf-8')).hexdigest()
+        etag = f'"{digest[:16]}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self._send(200, body, headers={'ETag': etag})
+    
+    def _send_document(self, body: bytes) -> None:
+        """Send a document, honouring `Range: bytes=N-`, `If-Range` and `If-None-Match`."""
+        etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        last_modified = 'Mon, 05 Oct 2026 09:00:00 GMT'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        start = 0
+        match = re.match(r'bytes=(\d+)-$', self.headers.get('Range', ''))
+        if_range = self.headers.get('If-Range')
+        if match and if_range is not None and if_range not in (etag, last_modified):
+            # The client's partial copy is of another version: send it all
+            match = None
+        if match:
+            start = int(match.group(1))
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{len(body)}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{len(body) - 1}/{len(body)}")
+        else:
+            self.send_response(200)
+        payload = body[start:]
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', last_modified)
+        self.send_header('Content-Type', 'application/pdf')
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+        
+        with self.state.lock:
+            drop_after, self.state.drop_download_after = self.state.drop_download_after, None
+        if drop_after is not None:
+            self.wfile.write(payload[:drop_after])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(payload)
+    
+    def _cookie(self, name: str) -> Optional[str]:
+        cookie = SimpleCookie(self.headers.get('Cookie', ''))
+        return cookie[name].value if name in cookie else None
+
+
+class EClassHandler(_Handler):
+    """Mock Open eClass endpoints."""
+    
+    cas_url: str
+    
+    def do_GET(self) -> None:
+        self._begin()
+        if self._transient_error():
+            return
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        
+        if url.path == '/main/login_form.php':
+            self._send(200, LOGIN_PAGE)
+        elif url.path == '/modules/auth/cas.php':
+            ticket = query.get('ticket', [None])[0]
+            if ticket is None:
+                service = quote(f"http://{self.headers['Host']}/modules/auth/cas.php", safe='')
+                self._send(302, headers={'Location': f"{self.cas_url}/cas/login?service={service}"})
+                return
+            with self.state.lock:
+                redeemed = ticket in self.state.tickets
+                self.state.tickets.discard(ticket)
+                session_id = secrets.token_hex(16)
+                if redeemed:
+                    self.state.sessions[session_id] = time.monotonic()
+            if not redeemed:
+                self._send(302, headers={'Location': '/main/login_form.php'})
+                return
+            self._send(302, headers={
+                'Location': '/main/portfolio.php',
+                'Set-Cookie': f"PHPSESSID={session_id}; Path=/; HttpOnly",
+            })
+        elif url.path == '/main/portfolio.php':
+            if self.state.session_valid(self._cookie('PHPSESSID')):
+                self._send_page(self.state.portfolio_html())
+            else:
+                self._send(302, headers={'Location': '/main/login_form.php'})
+        elif url.path == '/modules/announcements/index.php' and 'course' in query:
+            if self.state.session_valid(self._cookie('PHPSESSID')):
+                page = int(query.get('page', ['1'])[0])
+                self._send_page(self.state.announcements_html(query['course'][0], page))
+            else:
+                self._send(302, headers={'Location': '/main/login_form.php'})
+        elif url.path.startswith('/modules/document/file.php/'):
+            if self.state.session_valid(self._cookie('PHPSESSID')):
+                self._send_document(self.state.document_bytes(url.path))
+            else:
+                self._send(302, headers={'Location': '/main/login_form.php'})
+        elif url.path == '/index.php' and query.get('logout') == ['yes']:
+            with self.state.lock:
+                self.state.sessions.pop(self._cookie('PHPSESSID') or '', None)
+            self._send(200, LOGIN_PAGE)
+        else:
+            self._send(404, 'Not found')
+
+
+class CASHandler(_Handler):
+    """Mock CAS SSO endpoints."""
+    
+    def _render_form(self, service: str, message: str = '') -> None:
+        execution = f"e1s{secrets.token_urlsafe(96)}"
+        with self.state.lock:
+            self.state.executions.add(execution)
+        self._send(200, CAS_PAGE.format(
+            service=quote(service, safe=''), execution=execution, message=message
+        ))
+    
+    def do_GET(self) -> None:
+        self._begin()
+        if self._transient_error():
+            return
+        url = urlparse(self.path)
+        if url.path != '/cas/login':
+            self._send(404, 'Not found')
+            return
+        self._render_form(parse_qs(url.query).get('service', [''])[0])
+    
+    def do_POST(self) -> None:
+        self._begin()
+        url = urlparse(self.path)
+        length = int(self.headers.get('Content-Length', 0))
+        form = parse_qs(self.rfile.read(length).decode('utf-8'))
+        service = parse_qs(url.query).get('service', [''])[0]
+        if url.path != '/cas/login':
+            self._send(404, 'Not found')
+            return
+        
+        execution = form.get('execution', [''])[0]
+        password = form.get('password', [''])[0]
+        with self.state.lock:
+            valid_execution = execution in self.state.executions
+            self.state.executions.discard(execution)
+        if not valid_execution or (self.state.password is not None and password != self.state.password):
+            self._render_form(service, CAS_ERROR)
+            return
+        
+        ticket = f"ST-{secrets.token_hex(12)}"
+        with self.state.lock:
+            self.state.tickets.add(ticket)
+        self._send(302, headers={'Location': f"{service}?ticket={ticket}"})
+
+
+class MockEClass:
+    """Mock eClass and CAS servers running on background threads."""
+    
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, **options) -> None:
+        """
+        Args:
+            host: Bind address for both servers.
+            port: eClass port (0 picks a free one); CAS uses another free port.
+            **options: Passed to MockState.
+        """
+        self.state = MockState(**options)
+        cas_handler = type('BoundCASHandler', (CASHandler,), {'state': self.state})
+        self._cas = http.server.ThreadingHTTPServer((host, 0), cas_handler)
+        self.sso_domain = f"{host}:{self._cas.server_address[1]}"
+        
+        eclass_handler = type('BoundEClassHandler', (EClassHandler,), {
+            'state': self.state, 'cas_url': f"http://{self.sso_domain}",
+        })
+        self._eclass = http.server.ThreadingHTTPServer((host, port), eclass_handler)
+        self.eclass_url = f"http://{host}:{self._eclass.server_address[1]}"
+        
+        for httpd in (self._cas, self._eclass):
+            httpd.daemon_threads = True
+            threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    
+    def env(self) -> Dict[str, str]:
+        """Environment variables pointing the MCP server at this mock."""
+        return {
+            'ECLASS_URL': self.eclass_url,
+            'ECLASS_SSO_DOMAIN': self.sso_domain,
+            'ECLASS_SSO_PROTOCOL': 'http',
+        }
+    
+    def shutdown(self) -> None:
+        """Stop both servers."""
+        for httpd in (self._eclass, self._cas):
+            httpd.shutdown()
+            httpd.server_close()
+
+
+def main() -> None:
+    """Run the mock servers in the foreground."""
+    parser = argparse.ArgumentParser(description="Mock eClass and CAS servers")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080, help="eClass port (CAS picks a free port)")
+    parser.add_argument('--courses', type=int, default=12, help="Courses on the portfolio page")
+    parser.add_argument('--announcements', type=int, default=15, help="Announcements per course")
+    parser.add_argument('--document-size', type=int, default=1024 * 1024, help="Document size in bytes")
+    parser.add_argument('--latency', type=float, default=0.0, help="Per-request delay in milliseconds")
+    parser.add_argument('--session-lifetime', type=float, default=None,
+                        help="Seconds before eClass sessions expire")
+    parser.add_argument('--page-etags', action='store_true', help="Send ETags on HTML pages")
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help="Fraction of GETs answered with a transient 502/503")
+    args = parser.parse_args()
+    
+    mock = MockEClass(
+        args.host, args.port,
+        courses=args.courses,
+        announcements=args.announcements,
+        latency=args.latency / 1000,
+        document_size=args.document_size,
+        session_lifetime=args.session_lifetime,
+        page_etags=args.page_etags,
+        error_rate=args.error_rate,
+    )
+    print("Mock eClass running. Point the MCP server at it with:")
+    for name, value in mock.env().items():
+        print(f"  {name}={value}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        mock.shutdown()
+
+
+if __name__ == "__main__":
+    main()
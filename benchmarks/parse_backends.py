@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+HTML parser backend benchmark for eClass MCP Server.
+
+Checks every installed parser backend against the golden extraction results
+in fixtures/golden.json, then reports the per-page parse time of each backend.
+
+Usage:
+    python benchmarks/parse_backends.py [--runs N] [--update-golden]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+GOLDEN_PATH = os.path.join(FIXTURES_DIR, 'golden.json')
+
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+# Time the parsers themselves, not memo lookups
+os.environ['ECLASS_PARSE_MEMO_SIZE'] = '0'
+
+from eclass_mcp_server import html_parsing
+
+BASE_URL = 'https://eclass.uoa.gr'
+CAS_URL = 'https://sso.uoa.gr/login?service=https%3A%2F%2Feclass.uoa.gr%2Fmodules%2Fauth%2Fcas.php'
+
+
+def extractors_for(fixture: str) -> Dict[str, Callable[[str], Any]]:
+    """Return the extractors that apply to a fixture, keyed by name."""
+    if fixture.startswith('login_form'):
+        return {'extract_sso_link': lambda html: html_parsing.extract_sso_link(html, BASE_URL)}
+    if fixture.startswith('cas_'):
+        return {
+            'extract_cas_form_data': lambda html: list(
+                html_parsing.extract_cas_form_data(html, CAS_URL)
+            ),
+        }
+    if fixture.startswith('portfolio'):
+        return {
+            'extract_courses': lambda html: html_parsing.extract_courses(html, BASE_URL),
+            'verify_login_success': html_parsing.verify_login_success,
+        }
+    return {}
+
+
+def load_fixtures() -> List[Tuple[str, str]]:
+    """Return (name, html) for every HTML fixture."""
+    fixtures = []
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        if name.endswith('.html'):
+            with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as f:
+                fixtures.append((name, f.read()))
+    return fixtures
+
+
+def extract_all(fixtures: List[Tuple[str, str]]) -> Dict[str, Dict[str, Any]]:
+    """Run every applicable extractor over every fixture."""
+    return {
+        name: {key: extract(html) for key, extract in extractors_for(name).items()}
+        for name, html in fixtures
+    }
+
+
+def check_golden(fixtures: List[Tuple[str, str]], golden: Dict[str, Any]) -> List[str]:
+    """
+    Compare each backend's results to the golden file.
+    
+    Returns:
+        List of mismatch descriptions; empty if all backends agree.
+    """
+    failures = []
+    for backend in html_parsing.available_backends():
+        html_parsing.set_backend(backend)
+        results = extract_all(fixtures)
+        for name, expected in golden.items():
+            for key, value in expected.items():
+                actual = results.get(name, {}).get(key)
+                if actual != value:
+                    failures.append(f"{backend}: {name} {key} -> {actual!r}, expected {value!r}")
+    return failures
+
+
+def time_backends(fixtures: List[Tuple[str, str]], runs: int) -> None:
+    """Print the median extraction time per page for each backend."""
+    backends = html_parsing.available_backends()
+    print(f"{'page':<28} {'KiB':>6}  " + "  ".join(f"{b:>12}" for b in backends))
+    for name, html in fixtures:
+        row = []
+        for backend in backends:
+            html_parsing.set_backend(backend)
+            samples = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                for extract in extractors_for(name).values():
+                    extract(html)
+                samples.append(time.perf_counter() - start)
+            row.append(f"{statistics.median(samples) * 1000:>9.3f} ms")
+        size = len(html.encode('utf-8')) / 1024
+        print(f"{name:<28} {size:>6.1f}  " + "  ".join(row))
+
+
+def main() -> int:
+    """Verify backends against the golden corpus and benchmark them."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=50, help="Timed runs per page and backend")
+    parser.add_argument('--update-golden', action='store_true',
+                        help="Rewrite golden.json using the html.parser backend")
+    args = parser.parse_args()
+    
+    fixtures = load_fixtures()
+    
+    if args.update_golden:
+        html_parsing.set_backend('html.parser')
+        with open(GOLDEN_PATH, 'w', encoding='utf-8') as f:
+            json.dump(extract_all(fixtures), f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        print(f"Wrote {GOLDEN_PATH}")
+        return 0
+    
+    with open(GOLDEN_PATH, encoding='utf-8') as f:
+        golden = json.load(f)
+    
+    failures = check_golden(fixtures, golden)
+    if failures:
+        print("Backends disagree with the golden results:")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    print(f"All backends match the golden results: {', '.join(html_parsing.available_backends())}\n")
+    
+    time_backends(fixtures, args.runs)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
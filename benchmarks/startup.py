@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for eClass MCP Server.
+
+Spawns the stdio server the way an MCP client does and measures, from
+process spawn, how long it takes to answer `initialize`, `tools/list` and a
+first tool call (`authstatus`, which needs the session stack but no network).
+Each run is a fresh process; one untimed run first warms the bytecode cache.
+
+Both initialization modes are measured: lazy (the default, tool modules and
+sessions are loaded on first use) and eager (ECLASS_LAZY_INIT=false).
+
+Usage:
+    python benchmarks/startup.py [--runs N] [--modes lazy,eager] [--json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = ('lazy', 'eager')
+STEPS = ('initialize', 'tools/list', 'first call')
+
+# Same entry point as the `eclass-mcp-server` console script
+COMMAND = [sys.executable, '-c', 'from eclass_mcp_server import main; main()']
+
+REQUESTS = [
+    {'jsonrpc': '2.0', 'id': 1, 'method': 'initialize', 'params': {
+        'protocolVersion': '2025-06-18',
+        'capabilities': {},
+        'clientInfo': {'name': 'startup-bench', 'version': '0'},
+    }},
+    {'jsonrpc': '2.0', 'method': 'notifications/initialized'},
+    {'jsonrpc': '2.0', 'id': 2, 'method': 'tools/list'},
+    {'jsonrpc': '2.0', 'id': 3, 'method': 'tools/call',
+     'params': {'name': 'authstatus', 'arguments': {'random_string': 'bench'}}},
+]
+
+
+def server_env(mode: str, data_dir: str) -> Dict[str, str]:
+    """Environment for a server process in `mode`, isolated from real sessions."""
+    env = dict(os.environ)
+    env.update({
+        'PYTHONPATH': os.pathsep.join(filter(None, [os.path.join(ROOT, 'src'), env.get('PYTHONPATH')])),
+        'ECLASS_LAZY_INIT': 'true' if mode == 'lazy' else 'false',
+        'ECLASS_USERNAME': 'bench',
+        'ECLASS_PASSWORD': 'secret',
+        'ECLASS_DATA_DIR': data_dir,
+        'ECLASS_PERSIST_SESSION': 'false',
+        'ECLASS_MCP_TRANSPORT': 'stdio',
+    })
+    return env
+
+
+def run_once(env: Dict[str, str]) -> Dict[str, float]:
+    """Spawn the server once and return seconds from spawn to each response."""
+    timings: Dict[str, float] = {}
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        COMMAND, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL, text=True, encoding='utf-8',
+    )
+    try:
+        for request in REQUESTS:
+            process.stdin.write(json.dumps(request) + '\n')
+            process.stdin.flush()
+            if 'id' not in request:
+                continue
+            response = json.loads(process.stdout.readline())
+            if 'error' in response or response.get('result', {}).get('isError'):
+                raise RuntimeError(f"{request['method']} failed: {response}")
+            timings[STEPS[request['id'] - 1]] = time.perf_counter() - start
+    finally:
+        process.stdin.close()
+        process.wait(timeout=10)
+    return timings
+
+
+def percentile(samples: List[float], pct: int) -> float:
+    """Return the `pct`-th percentile of `samples`."""
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method='inclusive')[pct - 1]
+
+
+def run(mode: str, runs: int) -> List[Dict[str, Any]]:
+    """Measure `runs` cold starts in `mode`; return one row per step."""
+    env = server_env(mode, tempfile.mkdtemp(prefix='eclass-startup-'))
+    run_once(env)
+    samples = [run_once(env) for _ in range(runs)]
+    return [
+        {
+            'mode': mode,
+            'step': step,
+            'p50': percentile([s[step] for s in samples], 50) * 1000,
+            'p95': percentile([s[step] for s in samples], 95) * 1000,
+            'min': min(s[step] for s in samples) * 1000,
+        }
+        for step in STEPS
+    ]
+
+
+def main() -> None:
+    """Parse options, run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description="MCP server startup benchmark")
+    parser.add_argument('--runs', type=int, default=10, help="Timed cold starts per mode")
+    parser.add_argument('--modes', type=lambda s: s.split(','), default=list(MODES),
+                        help=f"Comma-separated modes (default: {','.join(MODES)})")
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = parser.parse_args()
+    
+    unknown = set(args.modes) - set(MODES)
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(sorted(unknown))}")
+    
+    rows = [row for mode in args.modes for row in run(mode, args.runs)]
+    
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    
+    print(f"\nruns={args.runs}, milliseconds from process spawn\n")
+    print(f"{'mode':<6} {'response':<11} {'p50 ms':>9} {'p95 ms':>9} {'min ms':>9}")
+    for row in rows:
+        print(f"{row['mode']:<6} {row['step']:<11} {row['p50']:>9.1f} {row['p95']:>9.1f} {row['min']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -51,7 +51,7 @@ class EClassClient:
         self.session = requests.Session()
         self.logged_in = False
         
-        # Configuration mirrors server.SessionState
+        # Configuration mirrors session.SessionState
         self.base_url = (base_url or os.getenv('ECLASS_URL', 'https://eclass.uoa.gr')).rstrip('/')
         self.eclass_domain = urlparse(self.base_url).netloc
         
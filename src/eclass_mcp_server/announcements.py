@@ -0,0 +1,190 @@
+"""
+Announcement retrieval for eClass MCP Server.
+
+Syncs each course's announcements into the local index (`store`), keyed by
+announcement id. eClass lists announcements newest first, so a sync reads pages only until
+it reaches announcements it has already stored; checking for news across all
+courses costs about one small request per course, and courses are synced
+concurrently through `fanout`.
+
+Announcements are stored once per course, but what counts as new is tracked
+per account: each account is shown everything stored since its own last
+sync, including announcements another account's sync fetched first.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import mcp.types as types
+
+from . import course_management, fanout, html_parsing, metrics, page_cache
+from .store import Store, for_session
+
+if TYPE_CHECKING:
+    from .session import SessionState
+
+logger = logging.getLogger('eclass_mcp_server.announcements')
+
+# Upper bound on pages read per course in one sync
+_MAX_PAGES = 50
+
+# Stored announcements listed when a single course is requested
+_LIST_LIMIT = 20
+
+
+def announcements_url(session_state: SessionState, code: str) -> str:
+    """Return the URL of a course's announcements page."""
+    return f"{session_state.base_url}/modules/announcements/index.php?course={quote(code)}"
+
+
+def _parse_page(html: str, page_url: str) -> Tuple[List[Dict[str, str]], Optional[str]]:
+    """Parse an announcements page into (announcements, next_page_url)."""
+    return (
+        html_parsing.extract_announcements(html, page_url),
+        html_parsing.extract_next_page(html, page_url),
+    )
+
+
+def sync_course(
+    session_state: SessionState, store: Store, code: str
+) -> Tuple[bool, Optional[str], Optional[List[Dict[str, str]]]]:
+    """
+    Fetch a course's announcements newer than the ones already stored and
+    return those the session's account has not seen yet.
+    
+    The account's seen mark is not advanced here but by the caller, once the
+    result is actually returned: a task past its fan-out deadline keeps
+    running, and must not hide what it found from the next call.
+    
+    Returns:
+        Tuple of (success, error_message, new_announcements), newest first.
+    """
+    last_stored = store.last_announcement_id(code)
+    url: Optional[str] = announcements_url(session_state, code)
+    fetched: List[Dict[str, str]] = []
+    
+    for _ in range(_MAX_PAGES):
+        with metrics.span('announcements.page', 'eclass_page_seconds', page='announcements') as step:
+            response, parsed = page_cache.fetch_parsed(
+                session_state, url, 'announcements', _parse_page, step, timeout=fanout.task_timeout()
+            )
+            if response is None:
+                return False, "Session expired. Please log in again.", None
+        page, next_url = parsed
+        
+        fetched.extend(a for a in page if int(a['id']) > last_stored)
+        # Pinned announcements may sit above newer ones, so only the oldest
+        # entry on the page tells whether later pages can hold anything new
+        if not page or int(page[-1]['id']) <= last_stored:
+            break
+        url = next_url
+        if not url:
+            break
+    
+    store.upsert_announcements(code, fetched)
+    new = store.announcements_after(code, store.last_seen_announcement_id(session_state.username, code))
+    return True, None, new
+
+
+def get_announcements(
+    session_state: SessionState, course: Optional[str] = None
+) -> Tuple[bool, Optional[str], Optional[List[Dict[str, Any]]]]:
+    """
+    Sync announcements for all enrolled courses, or for one course.
+    
+    Args:
+        course: Course code or name. If given, only that course is synced and
+            its latest stored announcements are returned, not just new ones.
+    
+    Returns:
+        Tuple of (success, message, results). Each result has 'code', 'name',
+        'announcements', 'new' (count) and 'error' (None on success) keys.
+    """
+    if not session_state.ensure_logged_in():
+        return False, "Not logged in. Please log in first using the login tool.", None
+    
+    store = for_session(session_state)
+    if store is None:
+        return False, "Local index unavailable; see the server log.", None
+    
+    # Course list: this session's, else the index (e.g. after a restart),
+    # else one portfolio fetch
+    courses = session_state.courses or store.courses(session_state.username)
+    if not courses:
+        success, message, courses = course_management.get_courses(session_state)
+        if not success:
+            return False, message, None
+    
+    if course:
+        wanted = course.casefold()
+        courses = [
+            c for c in courses
+            if wanted in c['name'].casefold() or (html_parsing.course_code(c['url']) or '').casefold() == wanted
+        ]
+        if not courses:
+            return False, f"No enrolled course matches '{course}'", None
+    
+    courses = [(c, html_parsing.course_code(c['url'])) for c in courses]
+    courses = [(c, code) for c, code in courses if code]
+    outcomes = fanout.fan_out(
+        lambda item: sync_course(session_state, store, item[1]),
+        courses,
+        session_state.base_url,
+    )
+    
+    results = []
+    # Newest id per course returned to the caller, recorded as seen at the end
+    seen: Dict[str, int] = {}
+    for (c, code), outcome, error in outcomes:
+        result: Dict[str, Any] = {'code': code, 'name': c['name'], 'announcements': [], 'new': 0, 'error': None}
+        if outcome is not None:
+            success, error, new = outcome
+        if error:
+            logger.error(f"Error getting announcements for {code}: {error}")
+            if not session_state.ensure_logged_in():
+                return False, error, None
+            result['error'] = error
+        else:
+            result['new'] = len(new)
+            if new:
+                seen[code] = int(new[0]['id'])
+            result['announcements'] = store.latest_announcements(code, _LIST_LIMIT) if course else new
+        results.append(result)
+    
+    for code, last_id in seen.items():
+        store.mark_announcements_seen(session_state.username, code, last_id)
+    logger.info(f"Synced announcements for {len(results)} courses")
+    return True, None, results
+
+
+def format_announcements_response(
+    success: bool, message: Optional[str], results: Optional[List[Dict[str, Any]]]
+) -> types.TextContent:
+    """Format announcement sync results for MCP."""
+    if not success:
+        return types.TextContent(
+            type="text",
+            text=f"Error: {message}",
+        )
+    
+    total_new = sum(result['new'] for result in results)
+    lines = [f"{total_new} new announcements across {len(results)} courses."]
+    for result in results:
+        if result['error']:
+            lines.append(f"\n{result['name']} ({result['code']}): Error: {result['error']}")
+            continue
+        if not result['announcements']:
+            continue
+        lines.append(f"\n{result['name']} ({result['code']}): {result['new']} new")
+        for announcement in result['announcements']:
+            date = f"[{announcement['date']}] " if announcement['date'] else ""
+            lines.append(f"- {date}{announcement['title']}")
+            lines.append(f"  URL: {announcement['url']}")
+    
+    return types.TextContent(
+        type="text",
+        text="\n".join(lines),
+    )
@@ -7,19 +7,24 @@ Handles authentication with eClass through UoA's SSO (CAS) system.
 from __future__ import annotations
 
 import logging
-from typing import TYPE_CHECKING, Optional, Tuple
+from typing import TYPE_CHECKING, Any, ContextManager, Dict, Optional, Tuple
 from urllib.parse import urlparse
 
 import mcp.types as types
 import requests
 
-from . import html_parsing
+from . import breaker, html_parsing, metrics
 
 if TYPE_CHECKING:
-    from .server import SessionState
+    from .session import SessionState
 
 logger = logging.getLogger('eclass_mcp_server.authentication')
 
+metrics.describe('eclass_login_seconds', "Full SSO login flow latency")
+metrics.describe('eclass_login_step_seconds', "SSO login step latency")
+metrics.describe('eclass_login_step_seconds_phase', "SSO login step latency by phase (http, ttfb, download, parse)")
+metrics.describe('eclass_login_total', "SSO login attempts by result")
+
 
 def attempt_login(
     session_state: SessionState, username: str, password: str
@@ -27,29 +32,59 @@ def attempt_login(
     """
     Attempt to log in to eClass using the SSO authentication flow.
     
+    Each step is timed with a `metrics.span` (see `_login_step()`), and
+    guarded by the circuit breaker of the endpoint it calls, so an outage of
+    eClass or SSO fails fast instead of waiting for network timeouts.
+    
     Returns:
         Tuple of (success, error_message). On success, error_message is None.
     """
+    with metrics.span('login', 'eclass_login_seconds') as flow:
+        success, error = _attempt_login(session_state, username, password)
+        flow['result'] = 'success' if success else 'failure'
+    metrics.increment('eclass_login_total', result=flow['result'])
+    return success, error
+
+
+def _login_step(step: str) -> ContextManager[Dict[str, Any]]:
+    """Time one step of the SSO flow into `eclass_login_step_seconds`."""
+    return metrics.span(f"login.{step}", 'eclass_login_step_seconds', step=step)
+
+
+def _attempt_login(
+    session_state: SessionState, username: str, password: str
+) -> Tuple[bool, Optional[str]]:
+    """Run the SSO login flow for `attempt_login()`."""
     try:
         # Step 1: Visit the eClass login form page
-        response = session_state.session.get(session_state.login_form_url)
-        response.raise_for_status()
-        
-        # Step 2: Find and follow the SSO login link
-        sso_link = html_parsing.extract_sso_link(response.text, session_state.base_url)
+        with _login_step('login_form') as step:
+            with breaker.guard('login_form', session_state.login_form_url):
+                with metrics.phase(step, 'http'):
+                    response = session_state.session.get(session_state.login_form_url)
+                metrics.record_response(step, response)
+                response.raise_for_status()
+            
+            # Step 2: Find the SSO login link
+            with metrics.phase(step, 'parse'):
+                sso_link = html_parsing.extract_sso_link(response.text, session_state.base_url)
         if not sso_link:
             return False, "Could not find SSO login link on the login page"
         
-        response = session_state.session.get(sso_link)
-        response.raise_for_status()
-        
-        # Step 3: Validate SSO redirect and extract CAS form data
-        if not _is_valid_sso_redirect(response.url, session_state):
-            return False, f"Unexpected redirect to {response.url}"
-        
-        execution, action, error_text = html_parsing.extract_cas_form_data(
-            response.text, response.url, session_state.sso_base_url
-        )
+        # Step 3: Follow the SSO link, validate the redirect and extract CAS form data
+        with _login_step('cas_form') as step:
+            with breaker.guard('cas', session_state.sso_base_url):
+                with metrics.phase(step, 'http'):
+                    response = session_state.session.get(sso_link)
+                metrics.record_response(step, response)
+                response.raise_for_status()
+            
+            if not _is_valid_sso_redirect(response.url, session_state):
+                return False, f"Unexpected redirect to {response.url}"
+            
+            with metrics.phase(step, 'parse'):
+                execution, action, error_text = html_parsing.extract_cas_form_data(
+                    response.text, response.url, session_state.sso_base_url
+                )
         
         if error_text and ('authenticate' in error_text.lower() or 'credentials' in error_text.lower()):
             return False, f"Authentication error: {error_text}"
@@ -67,16 +102,21 @@ def attempt_login(
             'geolocation': ''
         }
         
-        response = session_state.session.post(action, data=login_data)
-        response.raise_for_status()
-        
-        # Check for authentication errors in response
-        if 'Πόροι Πληροφορικής ΕΚΠΑ' in response.text or \
-           'The credentials you provided cannot be determined to be authentic' in response.text:
-            _, _, error_text = html_parsing.extract_cas_form_data(response.text, response.url)
-            if error_text:
-                return False, f"Authentication error: {error_text}"
-            return False, "Authentication failed: Invalid credentials"
+        with _login_step('credentials') as step:
+            with breaker.guard('cas', session_state.sso_base_url):
+                with metrics.phase(step, 'http'):
+                    response = session_state.session.post(action, data=login_data)
+                metrics.record_response(step, response)
+                response.raise_for_status()
+            
+            # Check for authentication errors in response
+            if 'Πόροι Πληροφορικής ΕΚΠΑ' in response.text or \
+               'The credentials you provided cannot be determined to be authentic' in response.text:
+                with metrics.phase(step, 'parse'):
+                    _, _, error_text = html_parsing.extract_cas_form_data(response.text, response.url)
+                if error_text:
+                    return False, f"Authentication error: {error_text}"
+                return False, "Authentication failed: Invalid credentials"
         
         logger.info("Successfully authenticated with SSO")
         
@@ -84,10 +124,16 @@ def attempt_login(
         if session_state.eclass_domain not in response.url:
             return False, f"Unexpected redirect after login: {response.url}"
         
-        response = session_state.session.get(session_state.portfolio_url)
-        response.raise_for_status()
-        
-        if not html_parsing.verify_login_success(response.text):
+        with _login_step('verify') as step:
+            with breaker.guard('portfolio', session_state.portfolio_url):
+                with metrics.phase(step, 'http'):
+                    response = session_state.session.get(session_state.portfolio_url)
+                metrics.record_response(step, response)
+                response.raise_for_status()
+            
+            with metrics.phase(step, 'parse'):
+                verified = html_parsing.verify_login_success(response.text)
+        if not verified:
             return False, "Could not access portfolio page after login"
         
         session_state.logged_in = True
@@ -95,6 +141,9 @@ def attempt_login(
         logger.info("Login successful, redirected to eClass portfolio")
         return True, None
     
+    except breaker.CircuitOpenError as e:
+        logger.warning(f"Login failed fast: {e}")
+        return False, f"{e}. Try again later."
     except requests.RequestException as e:
         logger.error(f"Request error during login: {e}")
         return False, f"Network error during login process: {e}"
@@ -149,7 +198,7 @@ def format_login_response(
     if success:
         return types.TextContent(
             type="text",
-            text=f"Login successful! You are now logged in as {username}.",
+            text=message or f"Login successful! You are now logged in as {username}.",
         )
     return types.TextContent(
         type="text",
@@ -177,18 +226,32 @@ def format_logout_response(
     )
 
 
-def format_authstatus_response(session_state: SessionState) -> types.TextContent:
-    """Format authentication status response for MCP."""
+def check_auth_status(session_state: SessionState) -> str:
+    """
+    Check whether the session is logged in and still accepted by eClass.
+    
+    Returns:
+        'logged_in', 'not_logged_in' or 'expired'.
+    """
     if not session_state.logged_in:
+        return 'not_logged_in'
+    if session_state.is_session_valid():
+        return 'logged_in'
+    return 'expired'
+
+
+def format_authstatus_response(status: str, username: Optional[str]) -> types.TextContent:
+    """Format authentication status response for MCP."""
+    if status == 'not_logged_in':
         return types.TextContent(
             type="text",
             text="Status: Not logged in",
         )
     
-    if session_state.is_session_valid():
+    if status == 'logged_in':
         return types.TextContent(
             type="text",
-            text=f"Status: Logged in as {session_state.username}",
+            text=f"Status: Logged in as {username}",
         )
     
     return types.TextContent(
@@ -0,0 +1,159 @@
+"""
+Content-addressed document cache for eClass MCP Server.
+
+Every downloaded document is stored once per distinct content, as a blob
+named by its SHA-256, and each document URL is mapped to its blob together
+with the ETag/Last-Modified validators it was served with (kept in the local
+index). Downloading a URL again sends a conditional request and, on 304, is
+served from the blob; a file linked from several courses, or re-uploaded
+under another name, is kept in the cache once. Downloads get their own copy
+of the blob (a copy-on-write clone where the file system supports it), so
+editing or deleting a downloaded file never touches the cache, and evicting
+a blob frees its space. The least recently used blobs are evicted once the
+cache outgrows ECLASS_CACHE_MAX_MB.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import shutil
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+from . import store
+
+if TYPE_CHECKING:
+    from .session import SessionState
+
+logger = logging.getLogger('eclass_mcp_server.blob_cache')
+
+_CHUNK_SIZE = 64 * 1024
+
+# Linux FICLONE ioctl: share a file's extents copy-on-write (btrfs, XFS)
+_FICLONE = 0x40049409
+
+
+def max_bytes() -> int:
+    """Return the cache size cap in bytes."""
+    return int(float(os.getenv('ECLASS_CACHE_MAX_MB', '2048')) * 1024 * 1024)
+
+
+def hash_file(path: str) -> str:
+    """Return the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _clone_or_copy(source: str, target: str) -> None:
+    """Copy `source` to `target`, as a copy-on-write clone where supported."""
+    if fcntl is not None:
+        try:
+            with open(source, 'rb') as src, open(target, 'wb') as dst:
+                fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+            return
+        except OSError:
+            # Not Linux, or the file system cannot clone
+            pass
+    shutil.copyfile(source, target)
+
+
+class BlobCache:
+    """Blobs on disk under `root`, with their metadata in the local index."""
+    
+    def __init__(self, index: store.Store, root: str, max_bytes: int) -> None:
+        self.index = index
+        self.root = root
+        self.max_bytes = max_bytes
+    
+    def blob_path(self, digest: str) -> str:
+        """Return where the blob with this digest is stored."""
+        return os.path.join(self.root, digest[:2], digest)
+    
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the cache entry for a URL.
+        
+        Returns:
+            Dict with 'hash', 'size', 'etag' and 'last_modified', or None if
+            the URL was never cached or its blob has gone missing.
+        """
+        entry = self.index.url_blob(url)
+        if entry and not os.path.exists(self.blob_path(entry['hash'])):
+            self.index.forget_blob(entry['hash'])
+            return None
+        return entry
+    
+    def add(
+        self,
+        path: str,
+        digest: str,
+        url: str,
+        etag: Optional[str],
+        last_modified: Optional[str],
+    ) -> None:
+        """
+        Move a completed download into the cache and map `url` to it.
+        
+        If a blob with the same content exists already, `path` is dropped and
+        the URL shares that blob.
+        """
+        size = os.path.getsize(path)
+        blob = self.blob_path(digest)
+        os.makedirs(os.path.dirname(blob), mode=0o700, exist_ok=True)
+        if os.path.exists(blob):
+            logger.debug(f"{url} has the same content as cached blob {digest[:12]}")
+            os.remove(path)
+        else:
+            os.replace(path, blob)
+        self.index.record_blob(url, digest, size, etag, last_modified)
+        self._evict(keep=digest)
+    
+    def copy_to(self, digest: str, path: str) -> None:
+        """
+        Place a copy of the blob at `path`, replacing any file there.
+        
+        The copy is independent of the blob: it is never a hard link, so
+        changes to the downloaded file cannot corrupt the cache.
+        """
+        blob = self.blob_path(digest)
+        temp_path = f"{path}.copy"
+        _clone_or_copy(blob, temp_path)
+        os.replace(temp_path, path)
+        self.index.touch_blob(digest)
+    
+    def _evict(self, keep: str) -> None:
+        """Drop least recently used blobs until the cache fits its cap."""
+        for digest in self.index.blobs_to_evict(self.max_bytes):
+            if digest == keep:
+                continue
+            try:
+                os.remove(self.blob_path(digest))
+            except FileNotFoundError:
+                pass
+            self.index.forget_blob(digest)
+            logger.debug(f"Evicted blob {digest[:12]}")
+
+
+def for_session(session_state: SessionState) -> Optional[BlobCache]:
+    """
+    Return the blob cache for a session's eClass instance.
+    
+    Returns:
+        The BlobCache, or None if the local index is unavailable (downloads
+        are then saved directly, without caching).
+    """
+    index = store.for_session(session_state)
+    if index is None:
+        return None
+    root = f"{os.path.splitext(index.path)[0]}-blobs"
+    return BlobCache(index, root, max_bytes())
+
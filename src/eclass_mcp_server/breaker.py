@@ -0,0 +1,171 @@
+"""
+Circuit breakers for eClass and SSO endpoints.
+
+When an endpoint (the eClass login form, CAS, the portfolio page) fails
+ECLASS_BREAKER_THRESHOLD times in a row, its breaker opens and further calls
+fail at once with a `CircuitOpenError` instead of each waiting for network
+timeouts. After ECLASS_BREAKER_RESET seconds one call is let through as a
+probe: if it succeeds the breaker closes, otherwise it stays open for another
+period. Breakers are shared by every session in the process.
+
+Only signs of an outage count as failures: connection errors, timeouts and
+5xx responses. A 4xx or a rejected password means the endpoint is up.
+"""
+
+import contextlib
+import logging
+import os
+import threading
+import time
+from typing import ContextManager, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+from . import metrics
+
+logger = logging.getLogger('eclass_mcp_server.breaker')
+
+metrics.describe('eclass_circuit_state', "Circuit breaker state per endpoint (0 closed, 1 half-open, 2 open)")
+metrics.describe('eclass_circuit_rejected_total', "Calls failed fast by an open circuit breaker")
+
+CLOSED = 'closed'
+HALF_OPEN = 'half_open'
+OPEN = 'open'
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# Human-readable endpoint names for error messages
+_ENDPOINT_NAMES = {
+    'login_form': "eClass login page",
+    'cas': "SSO (CAS) login",
+    'portfolio': "eClass portfolio page",
+}
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of calling an endpoint whose breaker is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one endpoint on one host."""
+    
+    def __init__(self, endpoint: str, host: str, threshold: int, reset_timeout: float) -> None:
+        """
+        Args:
+            endpoint: Endpoint name, e.g. 'cas'.
+            host: Host the endpoint lives on.
+            threshold: Consecutive failures that open the breaker; 0 never opens it.
+            reset_timeout: Seconds to stay open before letting a probe through.
+        """
+        self.endpoint = endpoint
+        self.host = host
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probe_thread: Optional[int] = None
+        self._lock = threading.Lock()
+        self._set_state(CLOSED)
+    
+    def _set_state(self, state: str) -> None:
+        """Change state and export it. Caller holds `_lock` (or is `__init__`)."""
+        if state != self.state:
+            logger.warning(f"Circuit for {self.endpoint} on {self.host} is now {state}")
+        self.state = state
+        metrics.set_gauge(
+            'eclass_circuit_state', _STATE_VALUES[state], endpoint=self.endpoint, host=self.host
+        )
+    
+    def _before(self) -> None:
+        """Let the call through or raise `CircuitOpenError`."""
+        with self._lock:
+            thread = threading.get_ident()
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN and self._probe_thread in (None, thread):
+                # This call probes; nested calls on the same thread join it
+                self._probe_thread = thread
+                return
+            if self.state == CLOSED:
+                return
+            retry_in = max(self.reset_timeout - (time.monotonic() - self._opened_at), 0)
+        metrics.increment('eclass_circuit_rejected_total', endpoint=self.endpoint, host=self.host)
+        name = _ENDPOINT_NAMES.get(self.endpoint, self.endpoint)
+        raise CircuitOpenError(
+            f"{name} ({self.host}) is unavailable after {self.failures} consecutive failures; "
+            f"not retrying for {retry_in:.0f}s"
+        )
+    
+    def _record(self, failed: Optional[bool]) -> None:
+        """Record a call's outcome; None if it says nothing about the endpoint."""
+        with self._lock:
+            if self._probe_thread == threading.get_ident():
+                self._probe_thread = None
+            if failed is None:
+                return
+            if not failed:
+                self.failures = 0
+                self._set_state(CLOSED)
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.threshold and self.failures >= self.threshold):
+                self._opened_at = time.monotonic()
+                self._set_state(OPEN)
+    
+    @contextlib.contextmanager
+    def guard(self) -> Iterator[None]:
+        """
+        Run the block as a call to the endpoint.
+        
+        Raises:
+            CircuitOpenError: If the breaker is open.
+        """
+        self._before()
+        try:
+            yield
+        except CircuitOpenError:
+            # Another endpoint's breaker, e.g. during a re-login
+            self._record(None)
+            raise
+        except requests.HTTPError as e:
+            status = e.response.status_code if e.response is not None else 500
+            self._record(status >= 500)
+            raise
+        except requests.RequestException:
+            self._record(True)
+            raise
+        except BaseException:
+            self._record(None)
+            raise
+        self._record(False)
+
+
+_breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+_lock = threading.Lock()
+
+
+def breaker(endpoint: str, url: str) -> CircuitBreaker:
+    """
+    Return the process-wide breaker for `endpoint` on the host of `url`.
+    
+    ECLASS_BREAKER_THRESHOLD is the consecutive failures that open it (0
+    disables breakers) and ECLASS_BREAKER_RESET the seconds before a probe.
+    """
+    host = urlparse(url).netloc
+    with _lock:
+        key = (endpoint, host)
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker(
+                endpoint,
+                host,
+                threshold=int(os.getenv('ECLASS_BREAKER_THRESHOLD', '5')),
+                reset_timeout=float(os.getenv('ECLASS_BREAKER_RESET', '30')),
+            )
+        return _breakers[key]
+
+
+def guard(endpoint: str, url: str) -> ContextManager[None]:
+    """Shorthand for `breaker(endpoint, url).guard()`."""
+    return breaker(endpoint, url).guard()
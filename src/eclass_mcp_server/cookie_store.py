@@ -0,0 +1,128 @@
+"""
+Persistent cookie storage for eClass MCP Server.
+
+Saves the authenticated `requests` cookie jar to disk, encrypted with a key
+derived from the user's password, so a restarted server can reuse the eClass
+session instead of repeating the CAS SSO flow.
+
+Encryption requires the optional `cryptography` package
+(`pip install eclass-mcp-server[cookies]`). Without it persistence is disabled.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import os
+from typing import Optional
+
+from requests.cookies import RequestsCookieJar, create_cookie
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:  # Optional dependency
+    Fernet = None
+    InvalidToken = Exception
+
+logger = logging.getLogger('eclass_mcp_server.cookie_store')
+
+_SALT_SIZE = 16
+_KDF_ITERATIONS = 100_000
+
+
+class CookieStore:
+    """Encrypted, per-user cookie jar file."""
+    
+    def __init__(self, path: str, secret: str) -> None:
+        self.path = path
+        self._secret = secret.encode('utf-8')
+    
+    def load(self, jar: RequestsCookieJar) -> bool:
+        """
+        Load stored cookies into `jar`.
+        
+        Returns:
+            True if cookies were restored. A missing, corrupt or undecryptable
+            file (e.g. after a password change) is discarded and returns False.
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                blob = f.read()
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            logger.warning(f"Could not read cookie store: {e}")
+            return False
+        
+        try:
+            salt, token = blob[:_SALT_SIZE], blob[_SALT_SIZE:]
+            payload = Fernet(self._derive_key(salt)).decrypt(token)
+            cookies = json.loads(payload)
+        except (InvalidToken, ValueError):
+            logger.warning(f"Discarding unreadable cookie store {self.path}")
+            self.clear()
+            return False
+        
+        for cookie in cookies:
+            jar.set_cookie(create_cookie(**cookie))
+        logger.info(f"Restored {len(cookies)} cookies from {self.path}")
+        return bool(cookies)
+    
+    def save(self, jar: RequestsCookieJar) -> None:
+        """Encrypt and write the cookies in `jar`, readable by the owner only."""
+        cookies = [
+            {
+                'name': c.name,
+                'value': c.value,
+                'domain': c.domain,
+                'path': c.path,
+                'secure': c.secure,
+                'expires': c.expires,
+                'rest': {'HttpOnly': None} if c.has_nonstandard_attr('HttpOnly') else {},
+            }
+            for c in jar
+        ]
+        salt = os.urandom(_SALT_SIZE)
+        token = Fernet(self._derive_key(salt)).encrypt(json.dumps(cookies).encode('utf-8'))
+        
+        try:
+            os.makedirs(os.path.dirname(self.path), mode=0o700, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(salt + token)
+            os.replace(tmp_path, self.path)
+            logger.debug(f"Saved {len(cookies)} cookies to {self.path}")
+        except OSError as e:
+            logger.warning(f"Could not write cookie store: {e}")
+    
+    def clear(self) -> None:
+        """Delete the stored cookies."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not delete cookie store: {e}")
+    
+    def _derive_key(self, salt: bytes) -> bytes:
+        """Derive a Fernet key from the secret with PBKDF2-HMAC-SHA256."""
+        key = hashlib.pbkdf2_hmac('sha256', self._secret, salt, _KDF_ITERATIONS)
+        return base64.urlsafe_b64encode(key)
+
+
+def open_store(
+    data_dir: str, base_url: str, username: str, secret: str
+) -> Optional[CookieStore]:
+    """
+    Open the cookie store for `username` on the eClass instance at `base_url`.
+    
+    Returns:
+        A CookieStore, or None if `cryptography` is not installed.
+    """
+    if Fernet is None:
+        logger.info("cryptography not installed; session cookies will not be persisted")
+        return None
+    
+    user_key = hashlib.sha256(f"{base_url}\0{username}".encode('utf-8')).hexdigest()[:32]
+    return CookieStore(os.path.join(data_dir, 'cookies', f"{user_key}.bin"), secret)
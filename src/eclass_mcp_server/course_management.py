@@ -2,23 +2,32 @@
 Course management module for eClass MCP Server.
 
 Handles retrieval and formatting of course information from eClass.
+Listings can be paged: the first page refreshes the course list from eClass,
+and later pages are read from the local index by cursor.
 """
 
 from __future__ import annotations
 
+import base64
+import binascii
 import logging
-from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+import sqlite3
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
 
 import mcp.types as types
 import requests
 
-from . import html_parsing
+from . import breaker, html_parsing, metrics, page_cache, store
+from .structured import COURSE_FIELDS, DEFAULT_COURSE_FIELDS, MAX_PAGE_SIZE
 
 if TYPE_CHECKING:
-    from .server import SessionState
+    from .session import SessionState
 
 logger = logging.getLogger('eclass_mcp_server.course_management')
 
+metrics.describe('eclass_page_seconds', "Authenticated page fetch and parse latency")
+metrics.describe('eclass_page_seconds_phase', "Authenticated page latency by phase (ttfb, parse)")
+
 
 def get_courses(
     session_state: SessionState
@@ -32,18 +41,26 @@ def get_courses(
         On empty result: (True, message, [])
         On failure: (False, error_message, None)
     """
-    if not session_state.logged_in:
+    if not session_state.ensure_logged_in():
         return False, "Not logged in. Please log in first using the login tool.", None
     
-    if not session_state.is_session_valid():
-        return False, "Session expired. Please log in again.", None
-    
     try:
-        response = session_state.session.get(session_state.portfolio_url)
-        response.raise_for_status()
-        
-        courses = html_parsing.extract_courses(response.text, session_state.base_url)
+        # A single request doubles as the session check: fetch() reports a
+        # login redirect as None and refreshes the validity cache otherwise.
+        # An unchanged portfolio is not parsed again.
+        with metrics.span('courses.portfolio', 'eclass_page_seconds', page='portfolio') as step:
+            with breaker.guard('portfolio', session_state.portfolio_url):
+                response, courses = page_cache.fetch_parsed(
+                    session_state,
+                    session_state.portfolio_url,
+                    'courses',
+                    lambda html, url: html_parsing.extract_courses(html, session_state.base_url),
+                    step,
+                )
+            if response is None:
+                return False, "Session expired. Please log in again.", None
         session_state.courses = courses
+        _index_courses(session_state, courses)
         
         if not courses:
             return True, "No courses found. You may not be enrolled in any courses.", []
@@ -51,6 +68,9 @@ def get_courses(
         logger.info(f"Successfully retrieved {len(courses)} courses")
         return True, None, courses
     
+    except breaker.CircuitOpenError as e:
+        logger.warning(f"Getting courses failed fast: {e}")
+        return False, f"{e}. Try again later.", None
     except requests.RequestException as e:
         logger.error(f"Network error getting courses: {e}")
         return False, f"Network error retrieving courses: {e}", None
@@ -59,10 +79,118 @@ def get_courses(
         return False, f"Error retrieving courses: {e}", None
 
 
+def get_courses_page(
+    session_state: SessionState, cursor: Optional[str] = None, limit: Optional[int] = None
+) -> Tuple[bool, Optional[str], Optional[Dict[str, Any]]]:
+    """
+    Retrieve one page of the enrolled courses.
+    
+    Without a cursor the course list is refreshed from eClass first. With a
+    cursor (from a previous page) it is not, so later pages need no request
+    to eClass. Every page is read from the local index when it is available,
+    so positions and the total agree across pages.
+    
+    Args:
+        cursor: `next_cursor` of the previous page.
+        limit: Courses per page (1 to MAX_PAGE_SIZE); all if None.
+    
+    Returns:
+        Tuple of (success, message, page).
+        On success: (True, message_or_None, {'courses', 'start', 'total',
+        'next_cursor'}), where 'start' is the 1-based number of the first
+        course and 'next_cursor' is None on the last page.
+        On failure: (False, error_message, None)
+    """
+    if not session_state.ensure_logged_in():
+        return False, "Not logged in. Please log in first using the login tool.", None
+    
+    if limit is not None:
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    
+    message = None
+    if cursor is None:
+        success, message, courses = get_courses(session_state)
+        if not success:
+            return False, message, None
+        after = -1
+    else:
+        after = _decode_cursor(cursor)
+        if after is None:
+            return False, "Invalid cursor. Call get_courses without a cursor to start over.", None
+    
+    try:
+        total, rows = _course_rows(session_state, after, None if limit is None else limit + 1)
+    except sqlite3.Error as e:
+        logger.error(f"Error reading courses from the local index: {e}")
+        return False, f"Error reading courses from the local index: {e}", None
+    
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1]['position'])
+    start = rows[0]['position'] + 1 if rows else total + 1
+    courses = [{key: row[key] for key in COURSE_FIELDS} for row in rows]
+    return True, message, {'courses': courses, 'start': start, 'total': total, 'next_cursor': next_cursor}
+
+
+def _course_rows(
+    session_state: SessionState, after: int, count: Optional[int]
+) -> Tuple[int, List[Dict[str, Any]]]:
+    """
+    Return (total, up to `count` courses after portfolio position `after`).
+    
+    Courses are read from the local index if it is available; otherwise the
+    session's course list is sliced.
+    """
+    index = store.for_session(session_state)
+    if index is not None:
+        return (
+            index.course_count(session_state.username),
+            index.courses_page(session_state.username, after, count),
+        )
+    rows = [
+        {**course, 'code': html_parsing.course_code(course['url']), 'position': position}
+        for position, course in enumerate(session_state.courses)
+        if position > after
+    ]
+    return len(session_state.courses), rows if count is None else rows[:count]
+
+
+def _encode_cursor(position: int) -> str:
+    """Encode a portfolio position as an opaque cursor."""
+    return base64.urlsafe_b64encode(f"courses:{position}".encode('ascii')).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor: str) -> Optional[int]:
+    """Decode a cursor from `_encode_cursor`; None if it is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        kind, _, position = base64.urlsafe_b64decode(padded).decode('ascii').partition(':')
+        return int(position) if kind == 'courses' else None
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def _index_courses(session_state: SessionState, courses: List[Dict[str, str]]) -> None:
+    """Upsert the course list into the local index; failures are only logged."""
+    index = store.for_session(session_state)
+    if index is None:
+        return
+    # Courses without a code are indexed too, so positions match the portfolio
+    indexed = [{**course, 'code': html_parsing.course_code(course['url'])} for course in courses]
+    try:
+        index.upsert_courses(session_state.username, indexed)
+    except sqlite3.Error as e:
+        logger.warning(f"Could not index courses: {e}")
+
+
 def format_courses_response(
-    success: bool, message: Optional[str], courses: Optional[List[Dict[str, str]]]
+    success: bool,
+    message: Optional[str],
+    page: Optional[Dict[str, Any]],
+    fields: Sequence[str] = DEFAULT_COURSE_FIELDS,
 ) -> types.TextContent:
-    """Format course list response for MCP."""
+    """Format a page of the course list for MCP."""
     if not success:
         return types.TextContent(
             type="text",
@@ -75,8 +203,19 @@ def format_courses_response(
             text=message,
         )
     
-    course_list = html_parsing.format_course_list(courses)
+    courses = page['courses']
+    course_list = html_parsing.format_course_list(courses, start=page['start'], fields=fields)
+    if page['start'] == 1 and page['next_cursor'] is None:
+        header = f"Found {page['total']} courses:"
+    elif courses:
+        end = page['start'] + len(courses) - 1
+        header = f"Found {page['total']} courses, showing {page['start']}-{end}:"
+    else:
+        header = f"Found {page['total']} courses, none left on this page."
+    text = f"{header}\n\n{course_list}" if courses else header
+    if page['next_cursor']:
+        text += f"\n\nMore courses: call get_courses with cursor \"{page['next_cursor']}\""
     return types.TextContent(
         type="text",
-        text=f"Found {len(courses)} courses:\n\n{course_list}",
+        text=text,
     )
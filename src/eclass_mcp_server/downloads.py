@@ -0,0 +1,423 @@
+"""
+Document downloads for eClass MCP Server.
+
+Streams documents to disk in fixed-size chunks, so memory use stays flat
+whatever the file size. Documents are saved under their path in the course
+(`<course>/<folders>/<name>`), so same-named files in different folders do
+not collide. Data is written to a `.part` file keyed by the full URL and
+moved into place once the size is verified; an interrupted download is
+resumed on the next call with an HTTP Range request, guarded by If-Range so
+a document changed in between is fetched again rather than spliced.
+Completed files go through the content-addressed `blob_cache`, so unchanged
+and duplicate documents are not fetched or stored twice.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urljoin, urlparse
+
+import mcp.types as types
+import requests
+
+from . import blob_cache, metrics, store
+
+if TYPE_CHECKING:
+    from .session import SessionState
+
+logger = logging.getLogger('eclass_mcp_server.downloads')
+
+metrics.describe('eclass_download_seconds', "Document download latency")
+metrics.describe('eclass_download_bytes_total', "Document bytes downloaded")
+metrics.describe('eclass_download_cache_total', "Document downloads by cache result (hit or miss)")
+
+_CHUNK_SIZE = 64 * 1024
+
+# Content-Range: bytes <start>-<end>/<total or *>
+_CONTENT_RANGE = re.compile(r'bytes (\d+)-(\d+)/(\d+|\*)')
+_UNSAFE_CHARS = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+
+# One writer per target file
+_path_locks: Dict[str, threading.Lock] = {}
+_path_locks_lock = threading.Lock()
+
+
+def download_dir(session_state: SessionState) -> str:
+    """Return the directory downloads are saved to."""
+    return os.path.expanduser(
+        os.getenv('ECLASS_DOWNLOAD_DIR', os.path.join(session_state.data_dir, 'downloads'))
+    )
+
+
+def document_course(url: str) -> Optional[str]:
+    """
+    Return the course code of a document URL.
+    
+    Handles `.../file.php/<code>/...` links and `?course=<code>` queries.
+    """
+    parsed = urlparse(url)
+    course = parse_qs(parsed.query).get('course')
+    if course:
+        return course[0]
+    parts = [part for part in parsed.path.split('/') if part]
+    if 'file.php' in parts[:-1]:
+        return parts[parts.index('file.php') + 1]
+    return None
+
+
+def _safe_name(name: str) -> str:
+    """Make a file name safe to use as a single path component."""
+    name = _UNSAFE_CHARS.sub('_', unquote(name)).strip(' .')
+    return name or 'document'
+
+
+def _document_path(url: str) -> List[str]:
+    """
+    Return a document's path within its course as a list of components.
+    
+    Handles `.../file.php/<code>/<path>` links and `?download=<path>`
+    queries; empty for any other URL.
+    """
+    parsed = urlparse(url)
+    download = parse_qs(parsed.query).get('download')
+    if download:
+        return [part for part in download[0].split('/') if part]
+    parts = [part for part in parsed.path.split('/') if part]
+    if 'file.php' in parts[:-1]:
+        return parts[parts.index('file.php') + 2:]
+    return []
+
+
+def _target_path(session_state: SessionState, url: str) -> str:
+    """
+    Return where a document is saved: `<download dir>/<course>/<path>`.
+    
+    A URL without a document path (e.g. a plain script link) is saved as its
+    file name plus a hash of the full URL, so distinct URLs never share a
+    file.
+    """
+    folder = _safe_name(document_course(url) or session_state.eclass_domain)
+    relative = [_safe_name(part) for part in _document_path(url)]
+    if not relative:
+        stem, ext = os.path.splitext(_safe_name(os.path.basename(urlparse(url).path)))
+        url_hash = hashlib.sha256(url.encode('utf-8')).hexdigest()[:12]
+        relative = [f"{stem}-{url_hash}{ext}"]
+    return os.path.join(download_dir(session_state), folder, *relative)
+
+
+def _part_path(session_state: SessionState, url: str) -> str:
+    """Return the partial download file for `url`, keyed by the full URL."""
+    url_hash = hashlib.sha256(url.encode('utf-8')).hexdigest()[:32]
+    return os.path.join(download_dir(session_state), '.partial', f"{url_hash}.part")
+
+
+def _read_validators(part_path: str, url: str) -> Optional[Dict[str, Optional[str]]]:
+    """Return the ETag and Last-Modified saved with a `.part` file, if they are for `url`."""
+    try:
+        with open(f"{part_path}.json", encoding='utf-8') as f:
+            validators = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return validators if isinstance(validators, dict) and validators.get('url') == url else None
+
+
+def _response_validators(response: requests.Response) -> Dict[str, Optional[str]]:
+    """Return the ETag and Last-Modified of a response."""
+    return {
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+    }
+
+
+def _write_validators(part_path: str, url: str, response: requests.Response) -> None:
+    """Save the validators of the response a `.part` file is being filled from."""
+    with open(f"{part_path}.json", 'w', encoding='utf-8') as f:
+        json.dump({'url': url, **_response_validators(response)}, f)
+
+
+def _discard_part(part_path: str) -> None:
+    """Remove a `.part` file and its validators."""
+    for leftover in (part_path, f"{part_path}.json"):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+
+
+def _if_range(validators: Optional[Dict[str, Optional[str]]]) -> Optional[str]:
+    """Return the If-Range value for resuming, or None if the part cannot be resumed safely."""
+    if not validators:
+        return None
+    etag = validators.get('etag')
+    # If-Range needs a strong validator; weak ETags only compare loosely
+    if etag and not etag.startswith('W/'):
+        return etag
+    return validators.get('last_modified')
+
+
+def _path_lock(path: str) -> threading.Lock:
+    with _path_locks_lock:
+        return _path_locks.setdefault(path, threading.Lock())
+
+
+def download_document(
+    session_state: SessionState, url: str
+) -> Tuple[bool, Optional[str], Optional[Dict[str, Any]]]:
+    """
+    Download a document from eClass to the local download directory.
+    
+    Returns:
+        Tuple of (success, message, document).
+        On success: (True, None, {'path', 'name', 'url', 'size', 'mime_type'})
+        On failure: (False, error_message, None). An interrupted transfer
+        leaves a `.part` file that the next call for the same URL resumes.
+    """
+    if not session_state.ensure_logged_in():
+        return False, "Not logged in. Please log in first using the login tool.", None
+    
+    url = urljoin(f"{session_state.base_url}/", url)
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or parsed.netloc != session_state.eclass_domain:
+        return False, f"Only documents on {session_state.eclass_domain} can be downloaded", None
+    
+    path = _target_path(session_state, url)
+    cache = blob_cache.for_session(session_state)
+    with _path_lock(path):
+        try:
+            with metrics.span('download', 'eclass_download_seconds') as step:
+                success, message, size = _stream_to_file(
+                    session_state, url, path, _part_path(session_state, url), step, cache
+                )
+        except requests.HTTPError as e:
+            status = e.response.status_code
+            logger.error(f"HTTP {status} downloading {url}")
+            # Server errors may pass, a missing or forbidden document will not
+            hint = " Call again to resume." if status >= 500 else ""
+            return False, f"Could not download document: HTTP {status} {e.response.reason}.{hint}", None
+        except requests.RequestException as e:
+            logger.error(f"Network error downloading {url}: {e}")
+            return False, f"Network error downloading document: {e}. Call again to resume.", None
+        except OSError as e:
+            logger.error(f"Could not save {url}: {e}")
+            return False, f"Could not save document: {e}", None
+        except sqlite3.Error as e:
+            logger.error(f"Document cache error for {url}: {e}")
+            return False, f"Document cache error: {e}", None
+    if not success:
+        return False, message, None
+    
+    name = os.path.basename(path)
+    document = {
+        'path': path,
+        'name': name,
+        'url': url,
+        'size': size,
+        'mime_type': mimetypes.guess_type(name)[0] or 'application/octet-stream',
+    }
+    _index_document(session_state, document)
+    logger.info(f"Downloaded {url} to {path} ({size} bytes)")
+    return True, None, document
+
+
+def _stream_to_file(
+    session_state: SessionState,
+    url: str,
+    path: str,
+    part_path: str,
+    step: Dict[str, Any],
+    cache: Optional[blob_cache.BlobCache],
+) -> Tuple[bool, Optional[str], Optional[int]]:
+    """
+    Stream `url` into `path`, resuming from `part_path` if present.
+    
+    A resume sends the validators saved with the part as If-Range, so the
+    server restarts the transfer if the document changed. With a cache, a
+    URL downloaded before is revalidated with a conditional request and
+    served from its blob when unchanged; new content is hashed while
+    streaming and stored as a blob that `path` is a copy of.
+    
+    Returns:
+        Tuple of (success, error_message, size).
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.makedirs(os.path.dirname(part_path), exist_ok=True)
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    if_range = _if_range(_read_validators(part_path, url)) if offset else None
+    if offset and not if_range:
+        # Without a validator a changed document could not be detected
+        logger.info(f"Restarting {url}: no validator to resume {part_path} safely")
+        _discard_part(part_path)
+        offset = 0
+    cached = cache.lookup(url) if cache else None
+    
+    # Identity encoding keeps byte counts comparable with Content-Length
+    headers = {'Accept-Encoding': 'identity'}
+    if offset:
+        headers['Range'] = f"bytes={offset}-"
+        headers['If-Range'] = if_range
+    elif cached:
+        if cached['etag']:
+            headers['If-None-Match'] = cached['etag']
+        if cached['last_modified']:
+            headers['If-Modified-Since'] = cached['last_modified']
+    
+    response = session_state.fetch(url, stream=True, headers=headers)
+    if response is None:
+        return False, "Session expired. Please log in again.", None
+    
+    step['status'] = response.status_code
+    with response:
+        if response.status_code == 304 and cached:
+            cache.copy_to(cached['hash'], path)
+            step['cache'] = 'hit'
+            metrics.increment('eclass_download_cache_total', result='hit')
+            return True, None, cached['size']
+        if response.status_code == 416 and offset:
+            # Nothing left to fetch if the .part already holds the whole file
+            match = re.match(r'bytes \*/(\d+)', response.headers.get('Content-Range', ''))
+            if match and int(match.group(1)) == offset:
+                # A 416 carries no validators; keep those of the response
+                # the part was filled from
+                validators = _read_validators(part_path, url) or {}
+                return True, None, _finish(
+                    url, path, part_path, validators, blob_cache.hash_file(part_path), cache
+                )
+            logger.warning(f"Discarding stale partial download {part_path}")
+            _discard_part(part_path)
+            return _stream_to_file(session_state, url, path, part_path, step, cache)
+        response.raise_for_status()
+        if response.status_code not in (200, 206):
+            # e.g. a 304 to a request that was not conditional: there is
+            # no body and nothing cached to serve
+            return False, f"Unexpected response from eClass: HTTP {response.status_code}", None
+        
+        expected = None
+        digest = hashlib.sha256()
+        if response.status_code == 206:
+            match = _CONTENT_RANGE.match(response.headers.get('Content-Range', ''))
+            if not match or int(match.group(1)) != offset:
+                return False, "Server returned an unexpected byte range", None
+            if match.group(3) != '*':
+                expected = int(match.group(3))
+            mode = 'ab'
+            step['resumed_from'] = offset
+            if cache:
+                with open(part_path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+                        digest.update(chunk)
+        else:
+            # Full response: a new download, or the document changed (If-Range
+            # failed) or the server ignored Range; start over
+            if offset:
+                step['restarted'] = True
+            offset = 0
+            mode = 'wb'
+            if 'Content-Length' in response.headers:
+                expected = int(response.headers['Content-Length'])
+            _write_validators(part_path, url, response)
+        
+        received = 0
+        with open(part_path, mode) as f:
+            for chunk in response.iter_content(chunk_size=_CHUNK_SIZE):
+                f.write(chunk)
+                if cache:
+                    digest.update(chunk)
+                received += len(chunk)
+        step['bytes'] = received
+        metrics.increment('eclass_download_bytes_total', received)
+        
+        size = offset + received
+        if expected is not None and size != expected:
+            return False, f"Incomplete download: got {size} of {expected} bytes. Call again to resume.", None
+        
+        if cache:
+            step['cache'] = 'miss'
+            metrics.increment('eclass_download_cache_total', result='miss')
+        # The saved validators matched If-Range, so they describe the whole file
+        validators = _read_validators(part_path, url) or _response_validators(response)
+        return True, None, _finish(url, path, part_path, validators, digest.hexdigest(), cache)
+
+
+def _finish(
+    url: str,
+    path: str,
+    part_path: str,
+    validators: Dict[str, Optional[str]],
+    digest: str,
+    cache: Optional[blob_cache.BlobCache],
+) -> int:
+    """
+    Move the completed `part_path` into place at `path`, through the cache if any.
+    
+    Args:
+        validators: ETag and Last-Modified the cache entry is revalidated with.
+    
+    Returns:
+        The document size in bytes.
+    """
+    size = os.path.getsize(part_path)
+    if cache is None:
+        os.replace(part_path, path)
+        _discard_part(part_path)
+        return size
+    cache.add(
+        part_path,
+        digest,
+        url,
+        validators.get('etag'),
+        validators.get('last_modified'),
+    )
+    _discard_part(part_path)
+    cache.copy_to(digest, path)
+    return size
+
+
+def _index_document(session_state: SessionState, document: Dict[str, Any]) -> None:
+    """Record the document in the local index so it is searchable."""
+    code = document_course(document['url'])
+    index = store.for_session(session_state)
+    if code is None or index is None:
+        return
+    try:
+        index.upsert_documents(code, [{
+            'id': urlparse(document['url']).path,
+            'name': document['name'],
+            'url': document['url'],
+            'size': document['size'],
+        }])
+    except sqlite3.Error as e:
+        logger.warning(f"Could not index document: {e}")
+
+
+def format_download_response(
+    success: bool, message: Optional[str], document: Optional[Dict[str, Any]]
+) -> list[types.TextContent | types.ResourceLink]:
+    """Format a download result for MCP: a summary plus a link to the local file."""
+    if not success:
+        return [
+            types.TextContent(
+                type="text",
+                text=f"Error: {message}",
+            )
+        ]
+    
+    return [
+        types.TextContent(
+            type="text",
+            text=f"Downloaded {document['name']} ({document['size']} bytes) to {document['path']}",
+        ),
+        types.ResourceLink(
+            type="resource_link",
+            uri=Path(document['path']).as_uri(),
+            name=document['name'],
+            mimeType=document['mime_type'],
+            size=document['size'],
+        ),
+    ]
@@ -0,0 +1,18 @@
+"""
+Environment loading for eClass MCP Server.
+
+Kept separate from the session module so the server can read its settings
+at startup without importing the HTTP and parsing stack.
+"""
+
+import os
+
+from dotenv import load_dotenv
+
+
+def load_env() -> None:
+    """Load .env from the project root without overriding the environment."""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(os.path.dirname(script_dir))
+    env_path = os.path.join(project_root, '.env')
+    load_dotenv(env_path, override=False)
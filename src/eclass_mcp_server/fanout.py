@@ -0,0 +1,131 @@
+"""
+Bounded-concurrency fan-out for multi-course operations.
+
+Runs one blocking task per item (usually per course) on a shared thread pool,
+so tools that touch every course scale with concurrency rather than course
+count. Tasks for the same host are limited to ECLASS_MAX_PER_HOST at a time
+across all callers, each task has its own deadline, and failures are
+reported per item instead of failing the whole call.
+"""
+
+import concurrent.futures
+import contextvars
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+from urllib.parse import urlparse
+
+logger = logging.getLogger('eclass_mcp_server.fanout')
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+# How often to re-check task deadlines while waiting
+_POLL_INTERVAL = 0.5
+
+_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_host_slots: Dict[str, threading.BoundedSemaphore] = {}
+_lock = threading.Lock()
+
+
+def max_workers() -> int:
+    """Return the size of the shared fan-out thread pool."""
+    return int(os.getenv('ECLASS_FANOUT_WORKERS', '16'))
+
+
+def max_per_host() -> int:
+    """Return the maximum number of concurrent tasks per host."""
+    return int(os.getenv('ECLASS_MAX_PER_HOST', '6'))
+
+
+def task_timeout() -> Optional[float]:
+    """Return the default per-item deadline in seconds; None (set 0) for no deadline."""
+    return float(os.getenv('ECLASS_COURSE_TIMEOUT', '30')) or None
+
+
+def _get_executor() -> concurrent.futures.ThreadPoolExecutor:
+    """Create the shared thread pool on first use."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=max_workers(), thread_name_prefix='eclass-fanout'
+            )
+        return _executor
+
+
+def _host_slot(url: str) -> threading.BoundedSemaphore:
+    """Return the semaphore bounding concurrent tasks for the host of `url`."""
+    host = urlparse(url).netloc
+    with _lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(max_per_host())
+        return _host_slots[host]
+
+
+def fan_out(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    host_url: str,
+    timeout: Optional[float] = None,
+) -> List[Tuple[T, Optional[R], Optional[str]]]:
+    """
+    Call `func(item)` for every item concurrently.
+    
+    Args:
+        func: Blocking task. It runs in a copy of the caller's context, so
+            metrics spans still land in the current tool call's trace.
+        items: Work items, e.g. course dicts.
+        host_url: URL of the host the tasks talk to; bounds concurrency.
+        timeout: Seconds each task may run once started; 0 for no deadline.
+            Defaults to ECLASS_COURSE_TIMEOUT. A task past its deadline is
+            reported as failed; its thread finishes in the background and
+            is ignored.
+    
+    Returns:
+        List of (item, result, error) tuples in input order. `error` is None
+        on success; otherwise `result` is None.
+    """
+    items = list(items)
+    timeout = task_timeout() if timeout is None else timeout or None
+    slot = _host_slot(host_url)
+    started: Dict[int, float] = {}
+    
+    def run(index: int, item: T) -> R:
+        with slot:
+            started[index] = time.monotonic()
+            return func(item)
+    
+    executor = _get_executor()
+    futures = {
+        executor.submit(contextvars.copy_context().run, run, index, item): index
+        for index, item in enumerate(items)
+    }
+    outcomes: Dict[int, Tuple[Optional[R], Optional[str]]] = {}
+    pending = set(futures)
+    
+    while pending:
+        done, pending = concurrent.futures.wait(
+            pending,
+            timeout=_POLL_INTERVAL if timeout is None else min(_POLL_INTERVAL, timeout),
+            return_when=concurrent.futures.FIRST_COMPLETED
+        )
+        for future in done:
+            index = futures[future]
+            try:
+                outcomes[index] = (future.result(), None)
+            except Exception as e:
+                logger.debug(f"Fan-out task failed: {e}")
+                outcomes[index] = (None, str(e) or type(e).__name__)
+        
+        now = time.monotonic()
+        for future in list(pending):
+            index = futures[future]
+            if timeout is not None and index in started and now - started[index] > timeout:
+                logger.debug(f"Fan-out task timed out after {timeout:g}s")
+                outcomes[index] = (None, f"Timed out after {timeout:g}s")
+                pending.discard(future)
+    
+    return [(item, *outcomes[index]) for index, item in enumerate(items)]
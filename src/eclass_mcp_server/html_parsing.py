@@ -2,15 +2,177 @@
 HTML parsing utilities for eClass MCP Server.
 
 Uses BeautifulSoup to extract data from eClass and CAS SSO HTML responses.
+Login-path extractors parse only what they need: the SSO link search builds
+just `<a>`/`<form>` elements, and the CAS page is scanned as a token stream
+that stops as soon as the login form is known.
+A C-backed parser is preferred when installed: `selectolax` (lexbor) for the
+large portfolio page, and `lxml` as the BeautifulSoup tree builder. Python's
+built-in `html.parser` is the fallback. Set ECLASS_HTML_PARSER to force one.
+Page extractors are memoized on a hash of the HTML, so a byte-identical page
+(the same portfolio, or a course page shared by several accounts) is not
+parsed twice.
 """
 
+import functools
+import hashlib
+import importlib.util
 import logging
-from typing import Dict, List, Optional, Tuple
+import os
+import re
+import threading
+from collections import OrderedDict
+from html.parser import HTMLParser
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+from urllib.parse import urljoin, urlparse
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+
+from . import metrics
 
 logger = logging.getLogger('eclass_mcp_server.html_parsing')
 
+metrics.describe('eclass_parse_memo_total', "Memoized page extractions by extractor and result (hit or miss)")
+
+T = TypeVar('T')
+
+# Parser backends in order of preference
+PARSER_BACKENDS = ('selectolax', 'lxml', 'html.parser')
+
+# Only these elements are built into the tree when looking for the SSO link
+_SSO_LINK_STRAINER = SoupStrainer(['a', 'form'])
+
+# Chunk size for feeding CAS pages to the streaming scanner
+_CAS_SCAN_CHUNK = 4096
+
+# CSS selectors for course titles on the portfolio page, tried in order
+_COURSE_SELECTORS = (
+    '.course-title',
+    '.lesson-title',
+    '.course-box .title',
+    '.course-info h4',
+)
+
+# Announcement links carry the announcement id in the `an_id` query parameter
+_ANNOUNCEMENT_ID = re.compile(r'[?&]an_id=(\d+)')
+
+# Link texts of a "next page" control, for pages without rel="next"
+_NEXT_PAGE_TEXTS = ('»', '›', 'Επόμενη', 'Next')
+
+# Extraction results of recent pages, keyed by (extractor, backend, sha256
+# of the HTML, base URL); 0 disables memoization
+_MEMO_SIZE = int(os.getenv('ECLASS_PARSE_MEMO_SIZE', '128'))
+_memo: OrderedDict[Tuple[str, str, str, str], Any] = OrderedDict()
+_memo_lock = threading.Lock()
+_memo_stats = {'hits': 0, 'misses': 0}
+
+
+def available_backends() -> List[str]:
+    """Return the installed parser backends, in order of preference."""
+    return [
+        backend for backend in PARSER_BACKENDS
+        if backend == 'html.parser' or importlib.util.find_spec(backend) is not None
+    ]
+
+
+def get_backend() -> str:
+    """Return the active parser backend."""
+    return _backend
+
+
+def set_backend(backend: str) -> None:
+    """
+    Select the parser backend.
+    
+    Raises:
+        ValueError: If the backend is unknown or not installed.
+    """
+    global _backend, _soup_features
+    if backend not in available_backends():
+        raise ValueError(f"HTML parser backend not available: {backend}")
+    _backend = backend
+    # selectolax only covers course extraction; other pages still use a soup,
+    # built with lxml when it is installed
+    if backend == 'html.parser' or 'lxml' not in available_backends():
+        _soup_features = 'html.parser'
+    else:
+        _soup_features = 'lxml'
+    logger.debug(f"Using HTML parser backend: {backend}")
+
+
+def _default_backend() -> str:
+    """Pick the backend from ECLASS_HTML_PARSER, or the fastest installed one."""
+    requested = os.getenv('ECLASS_HTML_PARSER', 'auto')
+    available = available_backends()
+    if requested in available:
+        return requested
+    if requested != 'auto':
+        logger.warning(f"HTML parser backend {requested!r} not available, using {available[0]}")
+    return available[0]
+
+
+def _make_soup(html_content: str, parse_only: Optional[SoupStrainer] = None) -> BeautifulSoup:
+    """Build a BeautifulSoup tree with the active tree builder."""
+    return BeautifulSoup(html_content, _soup_features, parse_only=parse_only)
+
+
+_backend = 'html.parser'
+_soup_features = 'html.parser'
+set_backend(_default_backend())
+
+
+def memo_info() -> Dict[str, int]:
+    """Return parse memo hits, misses, current size and capacity."""
+    with _memo_lock:
+        return {**_memo_stats, 'size': len(_memo), 'max_size': _MEMO_SIZE}
+
+
+def clear_memo() -> None:
+    """Drop all memoized results and reset the counters."""
+    with _memo_lock:
+        _memo.clear()
+        _memo_stats.update(hits=0, misses=0)
+
+
+def _copy_result(result: T) -> T:
+    """Copy an extractor result so callers cannot modify the memoized one."""
+    if isinstance(result, list):
+        return [dict(item) if isinstance(item, dict) else item for item in result]
+    return result
+
+
+def _memoized(extractor: Callable[[str, str], T]) -> Callable[[str, str], T]:
+    """
+    Memoize a page extractor taking `(html_content, base_url)`.
+    
+    Results are kept in a bounded LRU shared by all sessions and returned as
+    copies. The original function stays available as `__wrapped__`.
+    """
+    name = extractor.__name__
+    
+    @functools.wraps(extractor)
+    def wrapper(html_content: str, base_url: str) -> T:
+        if _MEMO_SIZE <= 0:
+            return extractor(html_content, base_url)
+        digest = hashlib.sha256(html_content.encode('utf-8', 'surrogatepass')).hexdigest()
+        key = (name, _backend, digest, base_url)
+        with _memo_lock:
+            hit = key in _memo
+            if hit:
+                _memo.move_to_end(key)
+                result = _memo[key]
+                _memo_stats['hits'] += 1
+        if not hit:
+            result = extractor(html_content, base_url)
+            with _memo_lock:
+                _memo[key] = result
+                while len(_memo) > _MEMO_SIZE:
+                    _memo.popitem(last=False)
+                _memo_stats['misses'] += 1
+        metrics.increment('eclass_parse_memo_total', extractor=name, result='hit' if hit else 'miss')
+        return _copy_result(result)
+    
+    return wrapper
+
 
 def extract_sso_link(html_content: str, base_url: str) -> Optional[str]:
     """
@@ -19,7 +181,7 @@ def extract_sso_link(html_content: str, base_url: str) -> Optional[str]:
     Returns:
         Absolute SSO login URL, or None if not found.
     """
-    soup = BeautifulSoup(html_content, 'html.parser')
+    soup = _make_soup(html_content, parse_only=_SSO_LINK_STRAINER)
     sso_link = None
     
     # Look for UoA login button
@@ -59,27 +221,30 @@ def extract_cas_form_data(
         Tuple of (execution_value, form_action, error_message).
         On parsing failure, appropriate values will be None.
     """
-    soup = BeautifulSoup(html_content, 'html.parser')
+    scanner = _CasFormScanner()
+    for start in range(0, len(html_content), _CAS_SCAN_CHUNK):
+        scanner.feed(html_content[start:start + _CAS_SCAN_CHUNK])
+        if scanner.done:
+            break
+    else:
+        scanner.close()
     
     # Check for error message
-    error_msg = soup.find('div', {'id': 'msg'})
-    error_text = error_msg.text.strip() if error_msg else None
+    error_text = ''.join(scanner.msg_parts).strip() if scanner.msg_parts is not None else None
     
     # Find execution token
-    execution_input = soup.find('input', {'name': 'execution'})
-    if not execution_input:
+    if not scanner.execution_found:
         logger.warning("Could not find execution parameter on SSO page")
         return None, None, error_text or "Could not find execution parameter on SSO page"
     
-    execution = execution_input.get('value')
+    execution = scanner.execution
     
     # Find login form
-    form = soup.find('form', {'id': 'fm1'}) or soup.find('form')
-    if not form:
+    if not scanner.form_found:
         logger.warning("Could not find login form on SSO page")
         return execution, None, error_text or "Could not find login form on SSO page"
     
-    action = form.get('action')
+    action = scanner.form_action
     if not action:
         action = current_url
     elif not action.startswith(('http://', 'https://')):
@@ -88,6 +253,64 @@ def extract_cas_form_data(
     return execution, action, error_text
 
 
+class _CasFormScanner(HTMLParser):
+    """
+    Streaming scanner for the CAS login page.
+    
+    Collects the `execution` input, the login form action (`form#fm1`, else
+    the first form) and the text of `div#msg` without building a tree, and
+    sets `done` once the execution token and `form#fm1` have both been seen,
+    so the caller can stop feeding the rest of the page.
+    """
+    
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.execution: Optional[str] = None
+        self.execution_found = False
+        self.form_action: Optional[str] = None
+        self.form_found = False
+        self.msg_parts: Optional[List[str]] = None
+        self.done = False
+        self._fm1_found = False
+        self._msg_depth = 0
+    
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        attributes = dict(attrs)
+        if self._msg_depth:
+            if tag == 'div':
+                self._msg_depth += 1
+        elif tag == 'div' and attributes.get('id') == 'msg' and self.msg_parts is None:
+            self.msg_parts = []
+            self._msg_depth = 1
+        
+        if tag == 'input' and attributes.get('name') == 'execution' and not self.execution_found:
+            self.execution = attributes.get('value')
+            self.execution_found = True
+        elif tag == 'form' and not self._fm1_found:
+            if attributes.get('id') == 'fm1':
+                self.form_action = attributes.get('action')
+                self.form_found = self._fm1_found = True
+            elif not self.form_found:
+                self.form_action = attributes.get('action')
+                self.form_found = True
+        
+        self.done = self.execution_found and self._fm1_found
+    
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        # Self-closing tags never open an element, so skip handle_endtag
+        self.handle_starttag(tag, attrs)
+        if tag == 'div' and self._msg_depth:
+            self._msg_depth -= 1
+    
+    def handle_endtag(self, tag: str) -> None:
+        if tag == 'div' and self._msg_depth:
+            self._msg_depth -= 1
+    
+    def handle_data(self, data: str) -> None:
+        if self._msg_depth:
+            self.msg_parts.append(data)
+
+
 def verify_login_success(html_content: str) -> bool:
     """
     Verify if login was successful by checking for portfolio page content.
@@ -97,6 +320,7 @@ def verify_login_success(html_content: str) -> bool:
             'course' in html_content.lower())
 
 
+@_memoized
 def extract_courses(html_content: str, base_url: str) -> List[Dict[str, str]]:
     """
     Extract course information from the portfolio page.
@@ -104,16 +328,26 @@ def extract_courses(html_content: str, base_url: str) -> List[Dict[str, str]]:
     Returns:
         List of dicts with 'name' and 'url' keys.
     """
+    if _backend == 'selectolax':
+        courses = _extract_courses_selectolax(html_content, base_url)
+    else:
+        courses = _extract_courses_soup(html_content, base_url)
+    
+    logger.debug(f"Extracted {len(courses)} courses")
+    return courses
+
+
+def _extract_courses_soup(html_content: str, base_url: str) -> List[Dict[str, str]]:
+    """BeautifulSoup implementation of `extract_courses`."""
     courses = []
-    soup = BeautifulSoup(html_content, 'html.parser')
+    soup = _make_soup(html_content)
     
     # Try specific course selectors
-    course_elements = (
-        soup.select('.course-title') or
-        soup.select('.lesson-title') or
-        soup.select('.course-box .title') or
-        soup.select('.course-info h4')
-    )
+    course_elements = []
+    for selector in _COURSE_SELECTORS:
+        course_elements = soup.select(selector)
+        if course_elements:
+            break
     
     if course_elements:
         for course_elem in course_elements:
@@ -138,10 +372,121 @@ def extract_courses(html_content: str, base_url: str) -> List[Dict[str, str]]:
                         'url': _make_absolute_url(href, base_url)
                     })
     
-    logger.debug(f"Extracted {len(courses)} courses")
     return courses
 
 
+def _extract_courses_selectolax(html_content: str, base_url: str) -> List[Dict[str, str]]:
+    """selectolax (lexbor) implementation of `extract_courses`."""
+    from selectolax.lexbor import LexborHTMLParser
+    
+    courses = []
+    tree = LexborHTMLParser(html_content)
+    
+    course_elements = []
+    for selector in _COURSE_SELECTORS:
+        course_elements = tree.css(selector)
+        if course_elements:
+            break
+    
+    if course_elements:
+        for course_elem in course_elements:
+            course_link = course_elem.css_first('a') or course_elem
+            course_url = course_link.attributes.get('href')
+            if course_url:
+                course_name = course_link.text().strip()
+                if course_name:
+                    courses.append({
+                        'name': course_name,
+                        'url': _make_absolute_url(course_url, base_url)
+                    })
+    else:
+        for link in tree.css('a'):
+            href = link.attributes.get('href') or ''
+            if 'courses' in href or 'course.php' in href:
+                course_name = link.text().strip()
+                if course_name:
+                    courses.append({
+                        'name': course_name,
+                        'url': _make_absolute_url(href, base_url)
+                    })
+    
+    return courses
+
+
+def course_code(course_url: str) -> Optional[str]:
+    """
+    Extract the course code from a course URL (`.../courses/<code>/`).
+    
+    Returns:
+        The course code, or None if the URL has no `courses/` segment.
+    """
+    parts = [part for part in urlparse(course_url).path.split('/') if part]
+    if 'courses' in parts[:-1]:
+        return parts[parts.index('courses') + 1]
+    return None
+
+
+@_memoized
+def extract_announcements(html_content: str, page_url: str) -> List[Dict[str, str]]:
+    """
+    Extract announcements from a course's announcements page.
+    
+    Returns:
+        List of dicts with 'id', 'title', 'date' and 'url' keys, in page
+        order (newest first on eClass). 'date' is empty if not shown.
+    """
+    soup = _make_soup(html_content)
+    announcements = []
+    seen = set()
+    
+    for link in soup.find_all('a', href=_ANNOUNCEMENT_ID):
+        announcement_id = _ANNOUNCEMENT_ID.search(link['href']).group(1)
+        title = link.get_text(' ', strip=True)
+        if not title or announcement_id in seen:
+            continue
+        seen.add(announcement_id)
+        
+        # The date is in the same table row: a "date" cell, or the last cell
+        date = ''
+        row = link.find_parent('tr')
+        if row:
+            cell = row.find(class_=re.compile('date'))
+            if cell is None:
+                cells = row.find_all('td')
+                if len(cells) > 1 and link not in cells[-1].descendants:
+                    cell = cells[-1]
+            if cell is not None:
+                date = cell.get_text(' ', strip=True)
+        
+        announcements.append({
+            'id': announcement_id,
+            'title': title,
+            'date': date,
+            'url': urljoin(page_url, link['href']),
+        })
+    
+    logger.debug(f"Extracted {len(announcements)} announcements")
+    return announcements
+
+
+@_memoized
+def extract_next_page(html_content: str, page_url: str) -> Optional[str]:
+    """
+    Find the link to the next page of a paginated listing.
+    
+    Returns:
+        Absolute URL of the next page, or None on the last page.
+    """
+    soup = _make_soup(html_content, parse_only=SoupStrainer('a'))
+    for link in soup.find_all('a', href=True):
+        if link['href'].startswith(('#', 'javascript:')):
+            continue  # Disabled control on the last page
+        rel = link.get('rel') or []
+        if 'next' in rel or link.get_text(strip=True) in _NEXT_PAGE_TEXTS:
+            return urljoin(page_url, link['href'])
+    return None
+
+
 def _make_absolute_url(url: str, base_url: str) -> str:
     """Convert relative URL to absolute URL."""
     if url.startswith(('http://', 'https://')):
@@ -149,15 +494,25 @@ def _make_absolute_url(url: str, base_url: str) -> str:
     return f"{base_url}/{url.lstrip('/')}"
 
 
-def format_course_list(courses: List[Dict[str, str]]) -> str:
+def format_course_list(
+    courses: List[Dict[str, str]], start: int = 1, fields: Sequence[str] = ('name', 'url')
+) -> str:
     """
     Format course list for display.
     
+    Args:
+        start: Number of the first course, for later pages of a listing.
+        fields: Which of 'name', 'code' and 'url' to show.
+    
     Returns:
-        Formatted string with numbered courses and URLs.
+        Formatted string with numbered courses and the requested fields.
     """
     lines = []
-    for i, course in enumerate(courses, 1):
-        lines.append(f"{i}. {course['name']}")
-        lines.append(f"   URL: {course['url']}")
+    for i, course in enumerate(courses, start):
+        title = course['name'] if 'name' in fields else course.get('code') or course['url']
+        lines.append(f"{i}. {title}")
+        if 'code' in fields and 'name' in fields:
+            lines.append(f"   Code: {course.get('code') or course_code(course['url'])}")
+        if 'url' in fields:
+            lines.append(f"   URL: {course['url']}")
     return "\n".join(lines)
@@ -0,0 +1,291 @@
+"""
+HTTP transports for eClass MCP Server.
+
+Serves the same MCP `Server` instance over Streamable HTTP (`/mcp`) or the
+legacy SSE transport (`/sse` + `/messages/`), so many clients can share one
+warm process, its session pool and connection pools. Both apps also serve
+Prometheus metrics at `/metrics`.
+
+With ECLASS_MCP_TOKENS_FILE set, every endpoint requires a bearer token and
+each token may only act as the accounts listed for it. Without it the
+endpoints are open, so tool calls are limited to the default account unless
+ECLASS_MCP_ALLOW_ACCOUNTS is enabled. Either way, requests must name an
+allowed Host (and Origin, if sent), so a web page cannot reach a local
+server through DNS rebinding.
+"""
+
+import contextlib
+import hmac
+import json
+import logging
+import os
+from typing import AsyncIterator, Dict, FrozenSet, Optional
+
+import uvicorn
+from mcp.server.lowlevel import Server
+from mcp.server.models import InitializationOptions
+from mcp.server.sse import SseServerTransport
+from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+from mcp.server.transport_security import TransportSecurityMiddleware, TransportSecuritySettings
+from starlette.applications import Starlette
+from starlette.datastructures import Headers
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+from starlette.routing import Mount, Route
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from . import metrics
+
+logger = logging.getLogger('eclass_mcp_server.http_server')
+
+# Request scope state key holding the accounts the caller's token may use
+_ACCOUNTS_STATE = 'eclass_accounts'
+
+Tokens = Dict[str, FrozenSet[str]]
+
+# Hosts always accepted in the Host header, as the SDK's FastMCP allows by default
+_LOOPBACK_HOSTS = ('localhost', '127.0.0.1', '[::1]')
+
+
+def load_tokens() -> Tokens:
+    """
+    Load client bearer tokens from ECLASS_MCP_TOKENS_FILE.
+    
+    The file is a JSON object mapping each token to the list of eClass
+    usernames it may act as; `"*"` in the list allows every account.
+    
+    Returns:
+        Mapping of token to allowed usernames; empty if the file is not
+        configured.
+    
+    Raises:
+        ValueError: If the file is configured but unreadable or malformed,
+            so the server never starts unprotected by mistake.
+    """
+    path = os.getenv('ECLASS_MCP_TOKENS_FILE')
+    if not path:
+        return {}
+    
+    try:
+        with open(os.path.expanduser(path), encoding='utf-8') as f:
+            tokens = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"Could not load tokens file {path}: {e}") from e
+    
+    if not isinstance(tokens, dict) or not all(isinstance(v, list) for v in tokens.values()):
+        raise ValueError(f"Tokens file {path} must contain a JSON object of token: [usernames]")
+    
+    logger.info(f"Loaded {len(tokens)} client tokens from {path}")
+    return {str(token): frozenset(map(str, accounts)) for token, accounts in tokens.items() if token}
+
+
+class _BearerAuth:
+    """ASGI middleware rejecting requests without a known bearer token."""
+    
+    def __init__(self, app: ASGIApp, tokens: Tokens) -> None:
+        self.app = app
+        self.tokens = tokens
+    
+    def _accounts(self, scope: Scope) -> Optional[FrozenSet[str]]:
+        """Return the accounts allowed to the request's token, or None if it has no valid token."""
+        scheme, _, token = Headers(scope=scope).get('authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not token:
+            return None
+        token = token.strip().encode('utf-8')
+        # Compare against every token in constant time
+        accounts = None
+        for known, allowed in self.tokens.items():
+            if hmac.compare_digest(known.encode('utf-8'), token):
+                accounts = allowed
+        return accounts
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        accounts = self._accounts(scope)
+        if accounts is None:
+            response = PlainTextResponse(
+                "Unauthorized", status_code=401, headers={'WWW-Authenticate': 'Bearer'}
+            )
+            await response(scope, receive, send)
+            return
+        # The SDK hands this request's scope to the tool handler, which
+        # checks the `account` argument against it
+        scope.setdefault('state', {})[_ACCOUNTS_STATE] = accounts
+        await self.app(scope, receive, send)
+
+
+def account_allowed(request: Request, account: Optional[str]) -> bool:
+    """
+    Check whether an HTTP client may act as `account`.
+    
+    Args:
+        request: The HTTP request carrying the tool call.
+        account: Requested eClass username; None for the default account.
+    
+    Returns:
+        With client tokens, whether the caller's token lists the account
+        (the default account must be listed by name too). Without them,
+        True only for the default account unless ECLASS_MCP_ALLOW_ACCOUNTS
+        is enabled.
+    """
+    default_account = os.getenv('ECLASS_USERNAME') or ''
+    allowed = request.scope.get('state', {}).get(_ACCOUNTS_STATE)
+    if allowed is not None:
+        return '*' in allowed or (account or default_account) in allowed
+    if not account or account == default_account:
+        return True
+    return os.getenv('ECLASS_MCP_ALLOW_ACCOUNTS', 'false').lower() in ('1', 'true', 'yes')
+
+
+def transport_security(host: str = '127.0.0.1') -> TransportSecuritySettings:
+    """
+    Build the DNS rebinding protection for both transports.
+    
+    Requests must carry a Host of the loopback names, the bind address or
+    a name in ECLASS_MCP_ALLOWED_HOSTS (comma separated, e.g. a reverse
+    proxy's `mcp.example.org`), on any port. An Origin header, if sent, must
+    be `http://` or `https://` on one of those hosts.
+    
+    Args:
+        host: Address the server binds to.
+    
+    Returns:
+        Settings for `StreamableHTTPSessionManager` and `SseServerTransport`.
+    """
+    names = list(_LOOPBACK_HOSTS)
+    extra = [host] + os.getenv('ECLASS_MCP_ALLOWED_HOSTS', '').split(',')
+    for name in (n.strip() for n in extra):
+        if ':' in name and not name.startswith('['):
+            name = f"[{name}]"
+        if name and name not in names and name not in ('0.0.0.0', '[::]'):
+            names.append(name)
+    allowed_hosts = [f"{name}:*" for name in names] + names
+    return TransportSecuritySettings(
+        enable_dns_rebinding_protection=True,
+        allowed_hosts=allowed_hosts,
+        allowed_origins=[f"{scheme}://{h}" for scheme in ('http', 'https') for h in allowed_hosts],
+    )
+
+
+def _middleware(tokens: Optional[Tokens]) -> list:
+    """Return the app middleware: bearer authentication if tokens are configured."""
+    return [Middleware(_BearerAuth, tokens=tokens)] if tokens else []
+
+
+class _StreamableHTTPApp:
+    """ASGI endpoint forwarding requests to the session manager."""
+    
+    def __init__(self, session_manager: StreamableHTTPSessionManager) -> None:
+        self.session_manager = session_manager
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.session_manager.handle_request(scope, receive, send)
+
+
+async def handle_metrics(request: Request) -> Response:
+    """Serve the in-process metrics in the Prometheus text format."""
+    return PlainTextResponse(metrics.render_prometheus(), media_type='text/plain; version=0.0.4')
+
+
+def create_streamable_http_app(
+    server: Server, tokens: Optional[Tokens] = None, host: str = '127.0.0.1'
+) -> Starlette:
+    """
+    Build a Starlette app serving `server` over Streamable HTTP at `/mcp`.
+    
+    Args:
+        server: MCP server to serve.
+        tokens: Client bearer tokens from `load_tokens()`; None or empty
+            leaves the endpoints open.
+        host: Bind address, accepted in the Host header besides loopback.
+    """
+    session_manager = StreamableHTTPSessionManager(
+        app=server, security_settings=transport_security(host)
+    )
+    
+    @contextlib.asynccontextmanager
+    async def lifespan(app: Starlette) -> AsyncIterator[None]:
+        async with session_manager.run():
+            yield
+    
+    return Starlette(
+        routes=[
+            Route('/mcp', endpoint=_StreamableHTTPApp(session_manager)),
+            Route('/metrics', endpoint=handle_metrics),
+        ],
+        middleware=_middleware(tokens),
+        lifespan=lifespan,
+    )
+
+
+def create_sse_app(
+    server: Server,
+    init_options: InitializationOptions,
+    tokens: Optional[Tokens] = None,
+    host: str = '127.0.0.1',
+) -> Starlette:
+    """
+    Build a Starlette app serving `server` over SSE at `/sse`.
+    
+    Args:
+        server: MCP server to serve.
+        init_options: Options sent in the `initialize` response.
+        tokens: Client bearer tokens from `load_tokens()`; None or empty
+            leaves the endpoints open.
+        host: Bind address, accepted in the Host header besides loopback.
+    """
+    security = transport_security(host)
+    sse = SseServerTransport('/messages/', security_settings=security)
+    
+    async def handle_sse(request: Request) -> Response:
+        # connect_sse() rejects a bad Host or Origin by raising after it has
+        # answered, so check first and return the rejection as a response
+        rejection = await TransportSecurityMiddleware(security).validate_request(request)
+        if rejection is not None:
+            return rejection
+        async with sse.connect_sse(request.scope, request.receive, request._send) as (
+            read_stream, write_stream
+        ):
+            await server.run(read_stream, write_stream, init_options)
+        return Response()
+    
+    return Starlette(
+        routes=[
+            Route('/sse', endpoint=handle_sse, methods=['GET']),
+            Mount('/messages/', app=sse.handle_post_message),
+            Route('/metrics', endpoint=handle_metrics),
+        ],
+        middleware=_middleware(tokens),
+    )
+
+
+async def serve(
+    server: Server,
+    init_options: InitializationOptions,
+    transport: str,
+    host: str,
+    port: int,
+) -> None:
+    """Run `server` over an HTTP transport until shut down."""
+    tokens = load_tokens()
+    if transport == 'streamable-http':
+        app = create_streamable_http_app(server, tokens, host)
+        endpoint = '/mcp'
+    elif transport == 'sse':
+        app = create_sse_app(server, init_options, tokens, host)
+        endpoint = '/sse'
+    else:
+        raise ValueError(f"Unknown HTTP transport: {transport}")
+    
+    if not tokens:
+        logger.warning(
+            "ECLASS_MCP_TOKENS_FILE is not set: HTTP endpoints are unauthenticated and any client "
+            "that can reach them acts as the default account"
+        )
+    
+    logger.info(f"Serving MCP over {transport} at http://{host}:{port}{endpoint}")
+    config = uvicorn.Config(app, host=host, port=port, log_level='info')
+    await uvicorn.Server(config).serve()
@@ -0,0 +1,202 @@
+"""
+In-process metrics for eClass MCP Server.
+
+A small thread-safe registry of counters, gauges and summaries, rendered in
+the Prometheus text format, plus timing spans that are also collected into a
+per-tool-call trace so they can be attached to the tool response.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import requests
+
+_LabelKey = Tuple[Tuple[str, str], ...]
+
+_lock = threading.Lock()
+_counters: Dict[str, Dict[_LabelKey, float]] = {}
+_gauges: Dict[str, Dict[_LabelKey, float]] = {}
+_summaries: Dict[str, Dict[_LabelKey, List[float]]] = {}  # [count, sum, min, max]
+_help: Dict[str, str] = {}
+
+# Spans recorded during the current tool call; copied into worker threads
+# by asyncio.to_thread along with the rest of the context
+_trace: contextvars.ContextVar[Optional[List[Dict[str, Any]]]] = contextvars.ContextVar(
+    'eclass_trace', default=None
+)
+
+
+def _key(labels: Dict[str, Any]) -> _LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def describe(name: str, help_text: str) -> None:
+    """Set the help text shown for a metric."""
+    _help[name] = help_text
+
+
+def increment(name: str, amount: float = 1, **labels: Any) -> None:
+    """Add `amount` to a counter."""
+    key = _key(labels)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[key] = series.get(key, 0) + amount
+
+
+def set_gauge(name: str, value: float, **labels: Any) -> None:
+    """Set a gauge to `value`."""
+    with _lock:
+        _gauges.setdefault(name, {})[_key(labels)] = value
+
+
+def observe(name: str, value: float, **labels: Any) -> None:
+    """Record one observation (e.g. a duration in seconds) in a summary."""
+    key = _key(labels)
+    with _lock:
+        series = _summaries.setdefault(name, {})
+        stats = series.get(key)
+        if stats is None:
+            series[key] = [1, value, value, value]
+        else:
+            stats[0] += 1
+            stats[1] += value
+            stats[2] = min(stats[2], value)
+            stats[3] = max(stats[3], value)
+
+
+def snapshot() -> Dict[str, Any]:
+    """
+    Return a copy of all metrics.
+    
+    Returns:
+        Dict with 'counters', 'gauges' and 'summaries', each mapping a metric
+        name to a list of {'labels': ..., ...} entries.
+    """
+    with _lock:
+        return {
+            'counters': {
+                name: [{'labels': dict(key), 'value': value} for key, value in series.items()]
+                for name, series in _counters.items()
+            },
+            'gauges': {
+                name: [{'labels': dict(key), 'value': value} for key, value in series.items()]
+                for name, series in _gauges.items()
+            },
+            'summaries': {
+                name: [
+                    {'labels': dict(key), 'count': s[0], 'sum': s[1], 'min': s[2], 'max': s[3]}
+                    for key, s in series.items()
+                ]
+                for name, series in _summaries.items()
+            },
+        }
+
+
+def render_prometheus() -> str:
+    """Render all metrics in the Prometheus text exposition format."""
+    def labels(key: _LabelKey) -> str:
+        if not key:
+            return ''
+        escaped = (value.replace('\\', '\\\\').replace('"', '\\"') for _, value in key)
+        return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(key, escaped)) + '}'
+    
+    lines = []
+    with _lock:
+        for kind, metrics in (('counter', _counters), ('gauge', _gauges)):
+            for name, series in sorted(metrics.items()):
+                if name in _help:
+                    lines.append(f"# HELP {name} {_help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+                for key, value in series.items():
+                    lines.append(f"{name}{labels(key)} {value}")
+        for name, series in sorted(_summaries.items()):
+            if name in _help:
+                lines.append(f"# HELP {name} {_help[name]}")
+            lines.append(f"# TYPE {name} summary")
+            for key, (count, total, _, _) in series.items():
+                lines.append(f"{name}_count{labels(key)} {count}")
+                lines.append(f"{name}_sum{labels(key)} {total}")
+    return '\n'.join(lines) + '\n'
+
+
+def reset() -> None:
+    """Clear all metrics."""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _summaries.clear()
+
+
+def start_trace() -> List[Dict[str, Any]]:
+    """Start collecting spans for the current context and return the list."""
+    trace: List[Dict[str, Any]] = []
+    _trace.set(trace)
+    return trace
+
+
+@contextlib.contextmanager
+def span(name: str, metric: str, **labels: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Time a block, recording it in the `metric` summary and the current trace.
+    
+    Yields:
+        The span record. Callers may add attributes such as phase timings
+        (`ttfb_ms`, `download_ms`, `parse_ms`); each `*_ms` attribute is also
+        recorded in `<metric>_phase` under a `phase` label.
+    """
+    record: Dict[str, Any] = {'name': name, **labels}
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record['error'] = type(e).__name__
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        record['duration_ms'] = round(duration * 1000, 3)
+        observe(metric, duration, **labels)
+        for attribute, value in record.items():
+            if attribute.endswith('_ms') and attribute != 'duration_ms':
+                observe(f"{metric}_phase", value / 1000, phase=attribute[:-3], **labels)
+        trace = _trace.get()
+        if trace is not None:
+            trace.append(record)
+
+
+@contextlib.contextmanager
+def phase(record: Dict[str, Any], name: str) -> Iterator[None]:
+    """Time a block and store it in `record` as `<name>_ms`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record[f"{name}_ms"] = round((time.perf_counter() - start) * 1000, 3)
+
+
+def record_response(record: Dict[str, Any], response: requests.Response) -> None:
+    """
+    Add HTTP timings for `response` (and any redirects it followed) to `record`.
+    
+    `ttfb_ms` is the time until response headers arrived, summed over the
+    redirect chain; it includes DNS, TCP and TLS setup when a new connection
+    was opened, which `requests` does not report separately, and the time
+    spent on any transport retries, which are counted in `retries`. If the
+    request was timed with `phase(record, 'http')`, the remainder is
+    `download_ms`.
+    """
+    responses = [*response.history, response]
+    record['status'] = response.status_code
+    record['requests'] = len(responses)
+    record['bytes'] = len(response.content)
+    record['ttfb_ms'] = round(sum(r.elapsed.total_seconds() for r in responses) * 1000, 3)
+    retries = sum(len(getattr(getattr(r.raw, 'retries', None), 'history', ())) for r in responses)
+    if retries:
+        record['retries'] = retries
+    if 'http_ms' in record:
+        record['download_ms'] = round(max(record['http_ms'] - record['ttfb_ms'], 0.0), 3)
@@ -0,0 +1,139 @@
+"""
+Revalidating page cache for eClass MCP Server.
+
+Remembers, per session, the validators (ETag, Last-Modified), a hash of the
+body and the parsed result of each scraped page. The next fetch of the page
+is conditional; on 304 the parsed result is reused without transferring or
+parsing the page again. eClass sends no validators for most of its PHP pages,
+so a 200 whose body hashes the same as last time also skips parsing. Bodies
+themselves are not kept, since callers only need the parsed result.
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple, TypeVar
+
+import requests
+
+from . import metrics
+
+if TYPE_CHECKING:
+    from .session import SessionState
+
+logger = logging.getLogger('eclass_mcp_server.page_cache')
+
+metrics.describe('eclass_page_cache_total', "Page fetches by cache result (revalidated, unchanged, miss)")
+
+T = TypeVar('T')
+
+
+def max_entries() -> int:
+    """Return how many parsed pages each session keeps."""
+    return int(os.getenv('ECLASS_PAGE_CACHE_SIZE', '256'))
+
+
+class PageCache:
+    """Bounded LRU map of (url, parser) to validators, body hash and parsed result."""
+    
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Tuple[str, str], Dict[str, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, url: str, key: str) -> Optional[Dict[str, Any]]:
+        """Return the entry for `url` parsed by `key`, marking it recently used."""
+        with self._lock:
+            entry = self._entries.get((url, key))
+            if entry is not None:
+                self._entries.move_to_end((url, key))
+            return entry
+    
+    def put(self, url: str, key: str, entry: Dict[str, Any]) -> None:
+        """Store an entry, evicting the least recently used beyond `max_entries`."""
+        with self._lock:
+            self._entries[(url, key)] = entry
+            self._entries.move_to_end((url, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Forget every page, e.g. when the session changes user."""
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def fetch_parsed(
+    session_state: SessionState,
+    url: str,
+    key: str,
+    parse: Callable[[str, str], T],
+    step: Dict[str, Any],
+    **kwargs: Any,
+) -> Tuple[Optional[requests.Response], Optional[T]]:
+    """
+    GET an authenticated eClass page and parse it, reusing the last result
+    if the page has not changed.
+    
+    Args:
+        url: Page URL.
+        key: Name of the parser, so one URL can be cached per parser.
+        parse: Called as `parse(html, final_url)` when the page changed.
+        step: Span record; receives the HTTP timings, a `parse` phase when
+            the page was parsed, and `cache` ('revalidated', 'unchanged' or
+            'miss').
+        **kwargs: Passed to `SessionState.fetch()`.
+    
+    Returns:
+        Tuple of (response, parsed). Both are None if the session expired.
+        The parsed result is a copy callers may modify.
+    
+    Raises:
+        requests.HTTPError: For an error status, as `raise_for_status()`.
+    """
+    cache = session_state.page_cache
+    entry = cache.get(url, key)
+    headers = dict(kwargs.pop('headers', None) or {})
+    if entry is not None:
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+    
+    response = session_state.fetch(url, headers=headers, **kwargs)
+    if response is None:
+        return None, None
+    metrics.record_response(step, response)
+    
+    if response.status_code == 304 and entry is not None:
+        result = 'revalidated'
+        parsed = entry['parsed']
+    else:
+        response.raise_for_status()
+        digest = hashlib.sha256(response.content).hexdigest()
+        if entry is not None and entry['hash'] == digest:
+            result = 'unchanged'
+            parsed = entry['parsed']
+        else:
+            result = 'miss'
+            with metrics.phase(step, 'parse'):
+                parsed = parse(response.text, response.url)
+        cache.put(url, key, {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'hash': digest,
+            'parsed': parsed,
+        })
+    
+    step['cache'] = result
+    metrics.increment('eclass_page_cache_total', result=result)
+    logger.debug(f"Page cache {result} for {url}")
+    return response, copy.deepcopy(parsed)
@@ -0,0 +1,99 @@
+"""
+Full-text search for eClass MCP Server.
+
+Answers from the local index (`store`) without contacting eClass: course
+names, announcement titles and document names synced by the other tools.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import mcp.types as types
+
+from . import metrics, store
+
+if TYPE_CHECKING:
+    from .session import SessionState
+
+logger = logging.getLogger('eclass_mcp_server.search')
+
+metrics.describe('eclass_search_seconds', "Local index search latency")
+
+_KIND_LABELS = {
+    'course': "Course",
+    'announcement': "Announcement",
+    'document': "Document",
+}
+
+
+def search(
+    session_state: SessionState, query: str, limit: int = 10
+) -> Tuple[bool, Optional[str], Optional[List[Dict[str, str]]]]:
+    """
+    Search the account's indexed course material.
+    
+    Returns:
+        Tuple of (success, message, hits).
+        On success: (True, None, hits)
+        On no hits: (True, message, [])
+        On failure: (False, error_message, None)
+    """
+    if not query or not query.strip():
+        return False, "Please provide a search query.", None
+    
+    limit = max(1, min(int(limit), 100))
+    
+    index = store.for_session(session_state)
+    if index is None:
+        return False, "Local index unavailable; see the server log.", None
+    
+    # Courses are indexed under the logged-in username; when logged out,
+    # the configured account is the one that last logged in
+    username = session_state.username or session_state.account
+    try:
+        with metrics.span('search', 'eclass_search_seconds'):
+            hits = index.search(username, query, limit)
+    except sqlite3.Error as e:
+        logger.error(f"Search error: {e}")
+        return False, f"Error searching the local index: {e}", None
+    
+    if not hits:
+        return True, (
+            f"No results for '{query}'. Only synced material is searched: "
+            "run get_courses and get_announcements to index it."
+        ), []
+    return True, None, hits
+
+
+def format_search_response(
+    success: bool, message: Optional[str], hits: Optional[List[Dict[str, str]]], query: str
+) -> types.TextContent:
+    """Format search results for MCP."""
+    if not success:
+        return types.TextContent(
+            type="text",
+            text=f"Error: {message}",
+        )
+    
+    if message:  # No results message
+        return types.TextContent(
+            type="text",
+            text=message,
+        )
+    
+    lines = [f"Found {len(hits)} results for '{query}':", ""]
+    for i, hit in enumerate(hits, 1):
+        label = _KIND_LABELS.get(hit['kind'], hit['kind'])
+        if hit['kind'] == 'course':
+            lines.append(f"{i}. [{label}] {hit['title']}")
+        else:
+            lines.append(f"{i}. [{label}] {hit['title']} - {hit['course_name']}")
+            lines.append(f"   Course: {hit['course_url']}")
+        lines.append(f"   URL: {hit['url']}")
+    return types.TextContent(
+        type="text",
+        text="\n".join(lines),
+    )
@@ -4,22 +4,27 @@ eClass MCP Server - MCP Integration for Open eClass Platform
 Provides an MCP server for interacting with eClass through UoA's SSO authentication.
 """
 
+from __future__ import annotations
+
+import argparse
 import asyncio
+import importlib
 import logging
 import os
-from typing import Any, Dict, List
-from urllib.parse import urlparse
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
-import requests
-from dotenv import load_dotenv
 from mcp.server.lowlevel import NotificationOptions, Server
 from mcp.server.models import InitializationOptions
 import mcp.server.stdio
 import mcp.types as types
 
-from . import authentication
-from . import course_management
-from . import html_parsing
+from . import metrics
+from . import structured
+from .env import load_env
+
+if TYPE_CHECKING:
+    from .session import SessionPool, SessionState
 
 logging.basicConfig(
     level=logging.INFO,
@@ -27,74 +32,53 @@ logging.basicConfig(
 )
 logger = logging.getLogger('eclass_mcp_server')
 
-server = Server("eclass-mcp")
+metrics.describe("eclass_tool_seconds", "Tool call latency")
 
+server = Server("eclass-mcp", version="0.1.0")
 
-class SessionState:
-    """Maintains authentication state between MCP tool calls."""
-    
-    def __init__(self) -> None:
-        # Load .env from project root
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        project_root = os.path.dirname(os.path.dirname(script_dir))
-        env_path = os.path.join(project_root, '.env')
-        load_dotenv(env_path, override=False)
-        
-        self.session = requests.Session()
-        self.logged_in = False
-        
-        # Base URL configuration
-        self.base_url = os.getenv('ECLASS_URL', 'https://eclass.uoa.gr').rstrip('/')
-        self.eclass_domain = urlparse(self.base_url).netloc
-        
-        # SSO configuration
-        self.sso_domain = os.getenv('ECLASS_SSO_DOMAIN', 'sso.uoa.gr')
-        sso_protocol = os.getenv('ECLASS_SSO_PROTOCOL', 'https')
-        self.sso_base_url = f"{sso_protocol}://{self.sso_domain}"
-        
-        # eClass endpoint URLs
-        self.login_form_url = f"{self.base_url}/main/login_form.php"
-        self.portfolio_url = f"{self.base_url}/main/portfolio.php"
-        self.logout_url = f"{self.base_url}/index.php?logout=yes"
-        
-        self.username: str | None = None
-        self.courses: List[Dict[str, str]] = []
-        
-        logger.info(f"Initialized eClass session for {self.base_url} (SSO: {self.sso_domain})")
-    
-    def is_session_valid(self) -> bool:
-        """Check if the current session is still valid."""
-        if not self.logged_in:
-            return False
-        
-        try:
-            response = self.session.get(self.portfolio_url, allow_redirects=False)
-            if response.status_code == 302 and 'login' in response.headers.get('Location', ''):
-                self.logged_in = False
-                return False
-            if response.status_code == 200 and html_parsing.verify_login_success(response.text):
-                return True
-            self.logged_in = False
-            return False
-        except Exception:
-            self.logged_in = False
-            return False
-    
-    def reset(self) -> None:
-        """Reset the session state."""
-        self.session = requests.Session()
-        self.logged_in = False
-        self.username = None
-        self.courses = []
+load_env()
+
+# Tool modules (requests, BeautifulSoup, the session stack) are imported and
+# the session pool created on first use, so `initialize` is answered sooner.
+# Set ECLASS_LAZY_INIT=false to load them before serving instead.
+lazy_init = os.getenv("ECLASS_LAZY_INIT", "true").lower() in ("1", "true", "yes")
+
+TOOL_MODULES = ("announcements", "authentication", "course_management", "downloads", "search")
 
+_session_pool: Optional[SessionPool] = None
+_session_pool_lock = threading.Lock()
 
-session_state = SessionState()
+# Attach the call's timing spans to each tool result under `_meta`
+timing_metadata = os.getenv("ECLASS_TIMING_METADATA", "false").lower() in ("1", "true", "yes")
+
+# Declare output schemas and return structuredContent (see structured.py)
+structured_output = structured.enabled()
+
+# A handler's text/link content plus its structured form
+ToolOutput = Tuple[List[types.TextContent | types.ResourceLink], Dict[str, Any]]
+
+
+def get_session_pool() -> SessionPool:
+    """Return the session pool, creating it on first use."""
+    global _session_pool
+    with _session_pool_lock:
+        if _session_pool is None:
+            from .session import SessionPool
+            _session_pool = SessionPool()
+        return _session_pool
+
+
+def preload() -> None:
+    """Import the tool modules and create the session pool now rather than on first use."""
+    for module in TOOL_MODULES:
+        importlib.import_module(f".{module}", __package__)
+    get_session_pool()
 
 
 @server.list_tools()
 async def handle_list_tools() -> list[types.Tool]:
     """List available eClass tools."""
-    return [
+    tools = [
         types.Tool(
             name="login",
             description="Log in to eClass using username/password from your .env file through UoA's SSO. Configure ECLASS_USERNAME and ECLASS_PASSWORD in your .env file.",
@@ -105,13 +89,50 @@ async def handle_list_tools() -> list[types.Tool]:
                         "type": "string",
                         "description": "Dummy parameter for no-parameter tools"
                     },
+                    "account": {
+                        "type": "string",
+                        "description": "eClass username to act as (defaults to ECLASS_USERNAME)"
+                    },
                 },
                 "required": ["random_string"],
             },
         ),
         types.Tool(
             name="get_courses",
-            description="Get list of enrolled courses from eClass",
+            description="Get list of enrolled courses from eClass. Pass limit to page through long lists: follow-up pages are requested with the returned cursor and served from the local index.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "random_string": {
+                        "type": "string",
+                        "description": "Dummy parameter for no-parameter tools"
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "Cursor from the previous page; omit to start from the first course"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "Maximum number of courses per page (default: all)",
+                        "minimum": 1,
+                        "maximum": structured.MAX_PAGE_SIZE
+                    },
+                    "fields": {
+                        "type": "array",
+                        "items": {"type": "string", "enum": list(structured.COURSE_FIELDS)},
+                        "description": "Course fields to return (default: name, url)"
+                    },
+                    "account": {
+                        "type": "string",
+                        "description": "eClass username to act as (defaults to ECLASS_USERNAME)"
+                    },
+                },
+                "required": ["random_string"],
+            },
+        ),
+        types.Tool(
+            name="get_announcements",
+            description="Check enrolled courses for new announcements since the last check. Only pages newer than the last-seen announcement are fetched. Pass a course to list its latest announcements instead.",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -119,10 +140,60 @@ async def handle_list_tools() -> list[types.Tool]:
                         "type": "string",
                         "description": "Dummy parameter for no-parameter tools"
                     },
+                    "course": {
+                        "type": "string",
+                        "description": "Course code or part of its name (defaults to all courses)"
+                    },
+                    "account": {
+                        "type": "string",
+                        "description": "eClass username to act as (defaults to ECLASS_USERNAME)"
+                    },
                 },
                 "required": ["random_string"],
             },
         ),
+        types.Tool(
+            name="search",
+            description="Search course names, announcements and document names already synced from eClass. Answers from the local index without contacting eClass; accents and case are ignored.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "Words to search for, e.g. 'midterm date'"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "Maximum number of results (default 10)",
+                        "minimum": 1,
+                        "maximum": 100
+                    },
+                    "account": {
+                        "type": "string",
+                        "description": "eClass username to act as (defaults to ECLASS_USERNAME)"
+                    },
+                },
+                "required": ["query"],
+            },
+        ),
+        types.Tool(
+            name="download_document",
+            description="Download a document from eClass to local disk and return its path. Large files are streamed, and an interrupted download resumes where it stopped when called again.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "url": {
+                        "type": "string",
+                        "description": "Document URL on eClass (absolute, or relative to the eClass base URL)"
+                    },
+                    "account": {
+                        "type": "string",
+                        "description": "eClass username to act as (defaults to ECLASS_USERNAME)"
+                    },
+                },
+                "required": ["url"],
+            },
+        ),
         types.Tool(
             name="logout",
             description="Log out from eClass",
@@ -133,6 +204,10 @@ async def handle_list_tools() -> list[types.Tool]:
                         "type": "string",
                         "description": "Dummy parameter for no-parameter tools"
                     },
+                    "account": {
+                        "type": "string",
+                        "description": "eClass username to act as (defaults to ECLASS_USERNAME)"
+                    },
                 },
                 "required": ["random_string"],
             },
@@ -147,89 +222,281 @@ async def handle_list_tools() -> list[types.Tool]:
                         "type": "string",
                         "description": "Dummy parameter for no-parameter tools"
                     },
+                    "account": {
+                        "type": "string",
+                        "description": "eClass username to act as (defaults to ECLASS_USERNAME)"
+                    },
                 },
                 "required": ["random_string"],
             },
         ),
     ]
+    if structured_output:
+        for tool in tools:
+            tool.outputSchema = structured.OUTPUT_SCHEMAS[tool.name]
+    return tools
 
 @server.call_tool()
 async def handle_call_tool(
     name: str, arguments: Dict[str, Any] | None
-) -> List[types.TextContent | types.ImageContent | types.EmbeddedResource]:
-    """Handle eClass tool execution requests."""
-    if name == "login":
-        return await handle_login()
-    elif name == "get_courses":
-        return await handle_get_courses()
-    elif name == "logout":
-        return await handle_logout()
-    elif name == "authstatus":
-        return await handle_authstatus()
-    else:
+) -> List[types.TextContent | types.ResourceLink] | types.CallToolResult:
+    """
+    Handle eClass tool execution requests.
+    
+    Returns:
+        The tool's content, or a CallToolResult when ECLASS_STRUCTURED_OUTPUT
+        (adds `structuredContent`) or ECLASS_TIMING_METADATA (adds the call's
+        timing spans in `_meta`) is enabled.
+    """
+    handlers = {
+        "login": handle_login,
+        "get_courses": handle_get_courses,
+        "get_announcements": handle_get_announcements,
+        "search": handle_search,
+        "download_document": handle_download_document,
+        "logout": handle_logout,
+        "authstatus": handle_authstatus,
+    }
+    if name not in handlers:
         raise ValueError(f"Unknown tool: {name}")
+    
+    arguments = arguments or {}
+    account = arguments.get("account")
+    trace = metrics.start_trace()
+    if not _account_allowed(account):
+        session_state = None
+        message = f"This client may not act as account {account or 'default'}."
+    else:
+        # Creating a session may read and decrypt its cookie store, so keep
+        # it off the event loop
+        session_state = await asyncio.to_thread(lambda: get_session_pool().get(account))
+        message = f"No credentials configured for account {account}. Add it to the file in ECLASS_ACCOUNTS_FILE."
+    if session_state is None:
+        content, data = [types.TextContent(type="text", text=f"Error: {message}")], structured.error(message)
+    else:
+        with metrics.span(f"tool.{name}", "eclass_tool_seconds", tool=name):
+            content, data = await handlers[name](session_state, arguments)
+    
+    meta = {"eclass/timings": trace} if timing_metadata else None
+    if structured_output:
+        # The JSON replaces the text summary; links to local files are kept
+        links = [item for item in content if isinstance(item, types.ResourceLink)]
+        return types.CallToolResult(
+            content=[structured.to_text(data), *links],
+            structuredContent=data,
+            isError=not data["ok"],
+            _meta=meta,
+        )
+    if meta is None:
+        return content
+    return types.CallToolResult(content=content, _meta=meta)
+
+
+def _account_allowed(account: Optional[str]) -> bool:
+    """
+    Check whether the calling client may act as `account`.
+    
+    stdio clients are the local user and may use every configured account;
+    HTTP clients are limited by `http_server.account_allowed()`.
+    """
+    try:
+        request = server.request_context.request
+    except LookupError:
+        # Called directly, outside an MCP request
+        return True
+    if request is None:
+        return True
+    from . import http_server
+    return http_server.account_allowed(request, account)
 
 
-async def handle_login() -> List[types.TextContent]:
+async def handle_login(
+    session_state: SessionState, arguments: Dict[str, Any]
+) -> ToolOutput:
     """Handle login to eClass."""
-    if session_state.logged_in and session_state.is_session_valid():
-        return [
-            types.TextContent(
-                type="text",
-                text=f"Already logged in as {session_state.username}",
-            )
-        ]
+    from . import authentication
     
-    if session_state.logged_in and not session_state.is_session_valid():
-        session_state.reset()
+    success, message, username = await session_state.run(_login)
+    return (
+        [authentication.format_login_response(success, message, username)],
+        structured.login(success, message, username),
+    )
+
+
+def _login(state: SessionState) -> Tuple[bool, Optional[str], Optional[str]]:
+    """
+    Run the blocking login flow; called on a worker thread.
+    
+    Returns:
+        Tuple of (success, message, username).
+    """
+    with state.lock:
+        if state.logged_in and state.is_session_valid():
+            return True, f"Already logged in as {state.username}", state.username
+        
+        if state.logged_in and not state.is_session_valid():
+            state.reset()
+        
+        username, password = state.credentials()
+        
+        if not username or not password:
+            return False, "Username and password must be provided in the .env file. Please set ECLASS_USERNAME and ECLASS_PASSWORD in your .env file.", None
+        
+        logger.info(f"Attempting to log in as {username}")
+        success, message = state.login(username, password)
+        return success, message, username if success else None
+
+
+async def handle_get_courses(
+    session_state: SessionState, arguments: Dict[str, Any]
+) -> ToolOutput:
+    """Handle getting a page of the list of enrolled courses."""
+    from . import course_management
     
-    username = os.getenv('ECLASS_USERNAME')
-    password = os.getenv('ECLASS_PASSWORD')
+    fields = [field for field in arguments.get("fields") or [] if field in structured.COURSE_FIELDS]
+    fields = fields or list(structured.DEFAULT_COURSE_FIELDS)
+    success, message, page = await session_state.run(
+        course_management.get_courses_page, arguments.get("cursor"), arguments.get("limit")
+    )
+    return (
+        [course_management.format_courses_response(success, message, page, fields)],
+        structured.courses(success, message, page, fields, session_state.base_url),
+    )
+
+
+async def handle_get_announcements(
+    session_state: SessionState, arguments: Dict[str, Any]
+) -> ToolOutput:
+    """Handle syncing course announcements."""
+    from . import announcements
     
-    if not username or not password:
-        return [
-            types.TextContent(
-                type="text",
-                text="Error: Username and password must be provided in the .env file. Please set ECLASS_USERNAME and ECLASS_PASSWORD in your .env file.",
-            )
-        ]
+    success, message, results = await session_state.run(
+        announcements.get_announcements, arguments.get("course")
+    )
+    return (
+        [announcements.format_announcements_response(success, message, results)],
+        structured.announcements(success, message, results, session_state.base_url),
+    )
+
+
+async def handle_search(
+    session_state: SessionState, arguments: Dict[str, Any]
+) -> ToolOutput:
+    """Handle searching the local index."""
+    from . import search
     
-    logger.info(f"Attempting to log in as {username}")
-    success, message = authentication.attempt_login(session_state, username, password)
-    return [authentication.format_login_response(success, message, username if success else None)]
+    query = arguments.get("query", "")
+    success, message, hits = await session_state.run(
+        search.search, query, arguments.get("limit", 10)
+    )
+    return (
+        [search.format_search_response(success, message, hits, query)],
+        structured.search(success, message, hits, session_state.base_url),
+    )
 
 
-async def handle_get_courses() -> List[types.TextContent]:
-    """Handle getting the list of enrolled courses."""
-    success, message, courses = course_management.get_courses(session_state)
-    return [course_management.format_courses_response(success, message, courses)]
+async def handle_download_document(
+    session_state: SessionState, arguments: Dict[str, Any]
+) -> ToolOutput:
+    """Handle downloading a document."""
+    from . import downloads
+    
+    success, message, document = await session_state.run(
+        downloads.download_document, arguments.get("url", "")
+    )
+    return (
+        downloads.format_download_response(success, message, document),
+        structured.document(success, message, document),
+    )
 
 
-async def handle_logout() -> List[types.TextContent]:
+async def handle_logout(
+    session_state: SessionState, arguments: Dict[str, Any]
+) -> ToolOutput:
     """Handle logout from eClass."""
-    success, username_or_error = authentication.perform_logout(session_state)
-    return [authentication.format_logout_response(success, username_or_error)]
+    from . import authentication
+    
+    success, username_or_error = await session_state.run(_logout)
+    return (
+        [authentication.format_logout_response(success, username_or_error)],
+        structured.logout(success, username_or_error),
+    )
+
+
+def _logout(state: SessionState) -> tuple[bool, str | None]:
+    """Run the blocking logout flow; called on a worker thread."""
+    from . import authentication
+    
+    with state.lock:
+        return authentication.perform_logout(state)
 
 
-async def handle_authstatus() -> List[types.TextContent]:
+async def handle_authstatus(
+    session_state: SessionState, arguments: Dict[str, Any]
+) -> ToolOutput:
     """Handle checking authentication status."""
-    return [authentication.format_authstatus_response(session_state)]
+    from . import authentication
+    
+    status = await session_state.run(authentication.check_auth_status)
+    return (
+        [authentication.format_authstatus_response(status, session_state.username)],
+        structured.authstatus(status, session_state.username),
+    )
+
+
+def _initialization_options() -> InitializationOptions:
+    """Build the options sent in the MCP `initialize` response."""
+    return InitializationOptions(
+        server_name="eclass-mcp",
+        server_version="0.1.0",
+        capabilities=server.get_capabilities(
+            notification_options=NotificationOptions(),
+            experimental_capabilities={},
+        ),
+    )
+
+
+def _parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    """Parse transport options; flags override the environment."""
+    parser = argparse.ArgumentParser(prog="eclass-mcp-server", description="eClass MCP server")
+    parser.add_argument(
+        "--transport",
+        choices=["stdio", "streamable-http", "sse"],
+        default=os.getenv("ECLASS_MCP_TRANSPORT", "stdio"),
+        help="MCP transport (env: ECLASS_MCP_TRANSPORT, default: stdio)",
+    )
+    parser.add_argument(
+        "--host",
+        default=os.getenv("ECLASS_MCP_HOST", "127.0.0.1"),
+        help="Bind address for HTTP transports (env: ECLASS_MCP_HOST, default: 127.0.0.1)",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=int(os.getenv("ECLASS_MCP_PORT", "8000")),
+        help="Port for HTTP transports (env: ECLASS_MCP_PORT, default: 8000)",
+    )
+    return parser.parse_args(argv)
 
 
 async def main() -> None:
     """Run the MCP server."""
+    args = _parse_args()
+    if not lazy_init:
+        preload()
+    
+    if args.transport != "stdio":
+        from . import http_server
+        await http_server.serve(
+            server, _initialization_options(), args.transport, args.host, args.port
+        )
+        return
+    
     async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
         await server.run(
             read_stream,
             write_stream,
-            InitializationOptions(
-                server_name="eclass-mcp",
-                server_version="0.1.0",
-                capabilities=server.get_capabilities(
-                    notification_options=NotificationOptions(),
-                    experimental_capabilities={},
-                ),
-            ),
+            _initialization_options(),
         )
 
 
@@ -0,0 +1,432 @@
+"""
+Session management for eClass MCP Server.
+
+`SessionState` holds one account's authenticated `requests.Session`, and
+`SessionPool` keeps many of them so one server process can serve many users.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+from urllib.parse import urljoin, urlparse
+
+import requests
+
+from . import authentication
+from . import cookie_store
+from . import html_parsing
+from . import page_cache
+from . import transport
+from .env import load_env
+
+logger = logging.getLogger('eclass_mcp_server.session')
+
+T = TypeVar('T')
+
+
+class SessionState:
+    """Maintains authentication state between MCP tool calls."""
+    
+    def __init__(
+        self,
+        username: str | None = None,
+        password: str | None = None,
+        adapter: transport.KeepAliveAdapter | None = None,
+    ) -> None:
+        """
+        Args:
+            username: Account to log in as. Defaults to ECLASS_USERNAME.
+            password: Password for the account. Defaults to ECLASS_PASSWORD.
+            adapter: Transport adapter to mount, so sessions can share
+                connection pools. Defaults to a private one per session.
+                Either way it outlives `reset()`, keeping its connections.
+        """
+        load_env()
+        
+        self.account = username if username is not None else os.getenv('ECLASS_USERNAME')
+        self._password = password if password is not None else os.getenv('ECLASS_PASSWORD')
+        
+        self._adapter = adapter or transport.new_adapter()
+        self.session = self._new_http_session()
+        self.logged_in = False
+        
+        # Base URL configuration
+        self.base_url = os.getenv('ECLASS_URL', 'https://eclass.uoa.gr').rstrip('/')
+        self.eclass_domain = urlparse(self.base_url).netloc
+        
+        # SSO configuration
+        self.sso_domain = os.getenv('ECLASS_SSO_DOMAIN', 'sso.uoa.gr')
+        sso_protocol = os.getenv('ECLASS_SSO_PROTOCOL', 'https')
+        self.sso_base_url = f"{sso_protocol}://{self.sso_domain}"
+        
+        # eClass endpoint URLs
+        self.login_form_url = f"{self.base_url}/main/login_form.php"
+        self.portfolio_url = f"{self.base_url}/main/portfolio.php"
+        self.logout_url = f"{self.base_url}/index.php?logout=yes"
+        
+        self.username: str | None = None
+        self.courses: List[Dict[str, str]] = []
+        
+        # Validators and parsed results of scraped pages, for conditional GETs
+        self.page_cache = page_cache.PageCache(page_cache.max_entries())
+        
+        # Validity cache: trust the session for this many seconds after the
+        # last successful authenticated response before re-checking eClass
+        self.session_ttl = float(os.getenv('ECLASS_SESSION_TTL', '300'))
+        self._validated_at: float | None = None
+        
+        # Serializes state-changing flows (login/logout) across worker threads.
+        # Re-entrant because a session check inside login may itself re-login.
+        self.lock = threading.RLock()
+        
+        # Transparent re-login when eClass expires the session mid-call;
+        # the generation counter lets concurrent callers share one re-login
+        self.auto_relogin = os.getenv('ECLASS_AUTO_RELOGIN', 'true').lower() not in ('0', 'false', 'no')
+        self._login_generation = 0
+        # Generation at which eClass was last seen expiring this session;
+        # None unless it expired after a login
+        self._expired_generation: int | None = None
+        
+        # Local storage for persisted session data
+        self.data_dir = os.path.expanduser(
+            os.getenv('ECLASS_DATA_DIR', os.path.join('~', '.cache', 'eclass-mcp-server'))
+        )
+        self.cookie_store: cookie_store.CookieStore | None = None
+        self._restore_session()
+        
+        logger.info(f"Initialized eClass session for {self.base_url} (SSO: {self.sso_domain})")
+    
+    def _new_http_session(self) -> requests.Session:
+        """Create a `requests.Session` with this state's adapter mounted."""
+        session = requests.Session()
+        session.mount('https://', self._adapter)
+        session.mount('http://', self._adapter)
+        return session
+    
+    def credentials(self) -> Tuple[str | None, str | None]:
+        """Return the (username, password) this session logs in with."""
+        return self.account, self._password
+    
+    def _restore_session(self) -> None:
+        """
+        Load persisted cookies for the configured user, if any.
+        
+        The restored session is validated lazily on first use; if eClass has
+        expired it, the next login falls back to the full SSO flow.
+        """
+        if os.getenv('ECLASS_PERSIST_SESSION', 'true').lower() in ('0', 'false', 'no'):
+            return
+        
+        username, password = self.credentials()
+        if not username or not password:
+            return
+        
+        self.cookie_store = cookie_store.open_store(self.data_dir, self.base_url, username, password)
+        if self.cookie_store and self.cookie_store.load(self.session.cookies):
+            self.logged_in = True
+            self.username = username
+            logger.info(f"Restored persisted session for {username}")
+    
+    def save_session(self) -> None:
+        """Persist the current cookies so a restarted server can skip SSO."""
+        if self.cookie_store:
+            self.cookie_store.save(self.session.cookies)
+    
+    def is_session_valid(self, force: bool = False) -> bool:
+        """
+        Check if the current session is still valid.
+        
+        Within `session_ttl` seconds of the last successful authenticated
+        response the cached answer is returned without contacting eClass.
+        Pass `force=True` to always re-check.
+        """
+        if not self.logged_in:
+            return False
+        
+        if not force and self._validated_at is not None and \
+                time.monotonic() - self._validated_at < self.session_ttl:
+            return True
+        
+        try:
+            response = self.fetch(self.portfolio_url)
+            if response is None:
+                return False
+            if response.status_code == 200 and html_parsing.verify_login_success(response.text):
+                return True
+            self.invalidate()
+            return False
+        except Exception:
+            self.invalidate()
+            return False
+    
+    def fetch(self, url: str, **kwargs: Any) -> requests.Response | None:
+        """
+        GET an authenticated eClass page, keeping the validity cache current.
+        
+        If eClass redirects to the login page, the session is refreshed once
+        via `refresh_login()` and the request is retried.
+        
+        Returns:
+            The response, or None if the session expired and could not be
+            refreshed (the session is then marked as expired).
+        """
+        generation = self._login_generation
+        response = self._get(url, **kwargs)
+        if response is None and self.refresh_login(generation):
+            response = self._get(url, **kwargs)
+        return response
+    
+    def _get(self, url: str, **kwargs: Any) -> requests.Response | None:
+        """
+        GET `url`, returning None on a redirect to the login page.
+        
+        Other redirects are followed from their Location rather than by
+        requesting `url` again. Only an authenticated portfolio page marks
+        the session valid: course pages and documents may be public, so
+        answering them proves nothing about the login.
+        """
+        response = self.session.get(url, allow_redirects=False, **kwargs)
+        if response.is_redirect:
+            location = urljoin(url, response.headers.get('Location', ''))
+            response.close()
+            if 'login' in location:
+                self.invalidate()
+                return None
+            response = self.session.get(location, **kwargs)
+            if 'login' in urlparse(response.url).path:
+                # Redirected on to the login page further down the chain
+                response.close()
+                self.invalidate()
+                return None
+        if response.ok and self._is_portfolio(response, kwargs.get('stream', False)):
+            self.mark_valid()
+        return response
+    
+    def _is_portfolio(self, response: requests.Response, stream: bool) -> bool:
+        """Check whether `response` is the portfolio page of a logged-in user."""
+        if stream or urlparse(response.url).path != urlparse(self.portfolio_url).path:
+            return False
+        return html_parsing.verify_login_success(response.text)
+    
+    def login(self, username: str, password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Run the SSO login flow and record the outcome. Caller holds `lock`.
+        
+        Returns:
+            Tuple of (success, error_message) from `attempt_login`.
+        """
+        success, message = authentication.attempt_login(self, username, password)
+        self._login_generation += 1
+        if success:
+            self.mark_valid()
+            self.save_session()
+        return success, message
+    
+    def refresh_login(self, seen_generation: int) -> bool:
+        """
+        Re-authenticate after eClass expired the session.
+        
+        Single-flight: callers pass the login generation they observed before
+        their request failed. The first caller through the lock re-runs SSO;
+        callers that were waiting on it see a newer generation and reuse its
+        result instead of starting another login.
+        
+        Returns:
+            True if the session is logged in again.
+        """
+        if not self.auto_relogin:
+            return False
+        
+        with self.lock:
+            if self._login_generation != seen_generation:
+                return self.logged_in
+            
+            username, password = self.credentials()
+            if not username or not password:
+                return False
+            
+            logger.info(f"Session expired, logging in again as {username}")
+            # Stale eClass/CAS cookies would short-circuit the CAS login form
+            self.session.cookies.clear()
+            success, message = self.login(username, password)
+            if not success:
+                logger.warning(f"Automatic re-login failed: {message}")
+            return success
+    
+    def ensure_logged_in(self) -> bool:
+        """
+        Check that the session is logged in, riding out a transparent re-login.
+        
+        `logged_in` is False from the moment eClass expires the session until
+        `refresh_login()` completes, so a call arriving in between would be
+        turned away. Instead it joins the re-login (waiting for the one in
+        flight, or running it) and is answered by its outcome.
+        
+        Returns:
+            True if the session is logged in, possibly again.
+        """
+        if self.logged_in:
+            return True
+        generation = self._expired_generation
+        return generation is not None and self.refresh_login(generation)
+    
+    def mark_valid(self) -> None:
+        """Record that eClass just accepted this session."""
+        self._validated_at = time.monotonic()
+    
+    def invalidate(self) -> None:
+        """Mark the session as expired; `ensure_logged_in()` may then re-login."""
+        self.logged_in = False
+        self._validated_at = None
+        self._expired_generation = self._login_generation
+    
+    def reset(self) -> None:
+        """Reset the session state and forget any persisted cookies."""
+        if self.cookie_store:
+            self.cookie_store.clear()
+        # A fresh cookie jar on the same adapter: pooled connections stay warm.
+        # The old session is not closed, as that would close the adapter too.
+        self.session = self._new_http_session()
+        self.logged_in = False
+        self.username = None
+        self.courses = []
+        self.page_cache.clear()
+        self._validated_at = None
+        # Logged out on purpose: nothing to re-login
+        self._expired_generation = None
+    
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """
+        Run a blocking eClass operation without stalling the event loop.
+        
+        The HTTP backend (`requests`) is synchronous, so `func` is called on a
+        worker thread with this session as its first argument. MCP protocol
+        traffic (pings, cancellations, other tool calls) keeps flowing meanwhile.
+        """
+        return await asyncio.to_thread(func, self, *args)
+
+
+class SessionPool:
+    """
+    Bounded pool of per-account sessions.
+    
+    Sessions are keyed by eClass username and evicted least-recently-used
+    once the pool is full, or after sitting idle. Evicted sessions keep
+    their persisted cookies, so a returning account usually skips SSO. All
+    sessions share one transport adapter, and with it the connection pools
+    to the eClass and SSO hosts.
+    """
+    
+    def __init__(
+        self, max_sessions: int | None = None, idle_timeout: float | None = None
+    ) -> None:
+        load_env()
+        
+        self.max_sessions = max_sessions or int(os.getenv('ECLASS_MAX_SESSIONS', '256'))
+        self.idle_timeout = idle_timeout or float(os.getenv('ECLASS_SESSION_IDLE_TIMEOUT', '3600'))
+        self.default_account = os.getenv('ECLASS_USERNAME')
+        self._accounts = load_accounts()
+        
+        # One host pool each for eClass and SSO (plus headroom), with enough
+        # pooled connections per host for concurrent tool calls
+        self._adapter = transport.new_adapter()
+        self._sessions: OrderedDict[str, SessionState] = OrderedDict()
+        self._last_used: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, account: str | None = None) -> SessionState | None:
+        """
+        Return the session for `account`, creating it if needed.
+        
+        Args:
+            account: eClass username. Defaults to ECLASS_USERNAME.
+        
+        Returns:
+            The account's SessionState, or None if no credentials are
+            configured for that account.
+        """
+        account = account or self.default_account or ''
+        
+        with self._lock:
+            state = self._touch(account)
+        if state is not None:
+            return state
+        
+        # Build outside the pool lock: restoring persisted cookies derives a
+        # key, which would otherwise stall every other account
+        if account == (self.default_account or ''):
+            # Credentials (or their absence) come from the environment
+            new_state = SessionState(adapter=self._adapter)
+        elif account in self._accounts:
+            new_state = SessionState(account, self._accounts[account], adapter=self._adapter)
+        else:
+            return None
+        
+        with self._lock:
+            # Another caller may have created the same session meanwhile
+            state = self._touch(account)
+            if state is not None:
+                return state
+            self._sessions[account] = new_state
+            self._last_used[account] = time.monotonic()
+            if len(self._sessions) > self.max_sessions:
+                evicted, _ = self._sessions.popitem(last=False)
+                self._last_used.pop(evicted, None)
+                logger.info(f"Evicted least recently used session for {evicted}")
+            return new_state
+    
+    def _touch(self, account: str) -> SessionState | None:
+        """Look up `account` and mark it most recently used. Caller holds `_lock`."""
+        now = time.monotonic()
+        self._evict_idle(now)
+        state = self._sessions.get(account)
+        if state is not None:
+            self._sessions.move_to_end(account)
+            self._last_used[account] = now
+        return state
+    
+    def __len__(self) -> int:
+        return len(self._sessions)
+    
+    def _evict_idle(self, now: float) -> None:
+        """Drop sessions unused for longer than `idle_timeout`. Caller holds `_lock`."""
+        for account in list(self._sessions):
+            if now - self._last_used.get(account, now) <= self.idle_timeout:
+                # Ordered by recency, so every later session is fresher
+                break
+            del self._sessions[account]
+            self._last_used.pop(account, None)
+            logger.info(f"Evicted idle session for {account}")
+
+
+def load_accounts() -> Dict[str, str]:
+    """
+    Load extra account credentials from ECLASS_ACCOUNTS_FILE.
+    
+    The file is a JSON object mapping eClass usernames to passwords.
+    
+    Returns:
+        Mapping of username to password; empty if the file is not configured.
+    """
+    path = os.getenv('ECLASS_ACCOUNTS_FILE')
+    if not path:
+        return {}
+    
+    try:
+        with open(os.path.expanduser(path), encoding='utf-8') as f:
+            accounts = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not load accounts file {path}: {e}")
+        return {}
+    
+    if not isinstance(accounts, dict):
+        logger.error(f"Accounts file {path} must contain a JSON object of username: password")
+        return {}
+    
+    logger.info(f"Loaded {len(accounts)} accounts from {path}")
+    return {str(username): str(password) for username, password in accounts.items()}
@@ -0,0 +1,509 @@
+"""
+Local SQLite index for eClass MCP Server.
+
+Scraped courses, documents and announcements, plus the metadata of the
+document blob cache, are upserted into one SQLite database per eClass
+instance under ECLASS_DATA_DIR, so tools can answer from the index and only
+go to the network to check for changes. The database runs
+in WAL mode so readers on other threads never wait for a writer.
+
+Course names, announcement titles and document names are also full-text
+indexed with FTS5 (with a LIKE fallback where SQLite lacks FTS5). Text is
+folded in Python before indexing and querying (accents stripped, casefolded),
+since SQLite's tokenizer does not fold Greek accents: "Εξέταση" matches
+"εξεταση" and "ΕΞΕΤΑΣΗ".
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from .session import SessionState
+
+logger = logging.getLogger('eclass_mcp_server.store')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (
+    account TEXT NOT NULL,
+    code TEXT NOT NULL,
+    name TEXT NOT NULL,
+    url TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    PRIMARY KEY (account, code)
+);
+CREATE INDEX IF NOT EXISTS courses_code ON courses (code);
+CREATE INDEX IF NOT EXISTS courses_position ON courses (account, position);
+CREATE INDEX IF NOT EXISTS courses_mtime ON courses (mtime);
+
+CREATE TABLE IF NOT EXISTS announcements (
+    course TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    date TEXT NOT NULL,
+    url TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    PRIMARY KEY (course, id)
+);
+CREATE INDEX IF NOT EXISTS announcements_mtime ON announcements (mtime);
+
+-- Highest announcement id each account has been shown per course
+CREATE TABLE IF NOT EXISTS announcement_sync (
+    account TEXT NOT NULL,
+    course TEXT NOT NULL,
+    last_id INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    PRIMARY KEY (account, course)
+);
+
+CREATE TABLE IF NOT EXISTS documents (
+    course TEXT NOT NULL,
+    id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    url TEXT NOT NULL,
+    size INTEGER,
+    modified TEXT,
+    mtime REAL NOT NULL,
+    PRIMARY KEY (course, id)
+);
+CREATE INDEX IF NOT EXISTS documents_mtime ON documents (mtime);
+
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blobs_last_used ON blobs (last_used);
+
+CREATE TABLE IF NOT EXISTS url_blobs (
+    url TEXT PRIMARY KEY,
+    hash TEXT NOT NULL REFERENCES blobs (hash),
+    etag TEXT,
+    last_modified TEXT,
+    mtime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS url_blobs_hash ON url_blobs (hash);
+
+CREATE TABLE IF NOT EXISTS search_docs (
+    rowid INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    course TEXT NOT NULL,
+    ref TEXT NOT NULL,
+    title TEXT NOT NULL,
+    url TEXT NOT NULL,
+    text TEXT NOT NULL,
+    UNIQUE (kind, course, ref)
+);
+"""
+
+# Full-text index over search_docs.text, kept in sync by triggers
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE search_fts USING fts5(
+    text, content='search_docs', content_rowid='rowid', tokenize='unicode61'
+);
+CREATE TRIGGER search_docs_ai AFTER INSERT ON search_docs BEGIN
+    INSERT INTO search_fts (rowid, text) VALUES (new.rowid, new.text);
+END;
+CREATE TRIGGER search_docs_ad AFTER DELETE ON search_docs BEGIN
+    INSERT INTO search_fts (search_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+END;
+CREATE TRIGGER search_docs_au AFTER UPDATE ON search_docs BEGIN
+    INSERT INTO search_fts (search_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+    INSERT INTO search_fts (rowid, text) VALUES (new.rowid, new.text);
+END;
+"""
+
+# Fills search_docs from the data tables (for databases created before search)
+_SEARCH_BACKFILL = """
+INSERT OR IGNORE INTO search_docs (kind, course, ref, title, url, text)
+    SELECT 'course', code, code, name, url, eclass_fold(name || ' ' || code) FROM courses;
+INSERT OR IGNORE INTO search_docs (kind, course, ref, title, url, text)
+    SELECT 'announcement', course, id, title, url, eclass_fold(title) FROM announcements;
+INSERT OR IGNORE INTO search_docs (kind, course, ref, title, url, text)
+    SELECT 'document', course, id, name, url, eclass_fold(name) FROM documents;
+"""
+
+_UPSERT_SEARCH_DOC = """
+INSERT INTO search_docs (kind, course, ref, title, url, text) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (kind, course, ref) DO UPDATE SET
+    title = excluded.title, url = excluded.url, text = excluded.text
+"""
+
+_WORD = re.compile(r'\w+')
+
+
+def fold(text: str) -> str:
+    """Fold text for search: strip accents (NFD, drop marks) and casefold."""
+    decomposed = unicodedata.normalize('NFD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+class Store:
+    """SQLite index of courses, documents and announcements."""
+    
+    def __init__(self, path: str) -> None:
+        self.path = path
+        # One connection per thread: sqlite3 connections must not be shared,
+        # and separate connections let WAL readers run alongside a writer
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        self.fts = self._create_schema(self._connect())
+    
+    def _create_schema(self, connection: sqlite3.Connection) -> bool:
+        """
+        Create missing tables and the full-text index.
+        
+        Returns:
+            True if FTS5 is available; otherwise search falls back to LIKE.
+        """
+        tables = {row[0] for row in connection.execute("SELECT name FROM sqlite_master")}
+        connection.executescript(_SCHEMA)
+        if 'search_docs' not in tables:
+            connection.executescript(_SEARCH_BACKFILL)
+        if 'search_fts' in tables:
+            return True
+        try:
+            connection.executescript(_FTS_SCHEMA)
+        except sqlite3.OperationalError as e:
+            logger.info(f"FTS5 unavailable, search falls back to LIKE: {e}")
+            return False
+        connection.execute("INSERT INTO search_fts (search_fts) VALUES ('rebuild')")
+        return True
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.create_function('eclass_fold', 1, fold, deterministic=True)
+            self._local.connection = connection
+        return connection
+    
+    def upsert_courses(self, account: str, courses: List[Dict[str, str]]) -> None:
+        """
+        Replace an account's course list.
+        
+        Courses must carry a 'code' key. A course whose link has no code is
+        stored under its URL instead, so every course keeps its portfolio
+        position; it is not searchable. Courses no longer listed (e.g. after
+        unenrolling) are removed.
+        """
+        now = time.time()
+        connection = self._connect()
+        with connection:
+            connection.execute('BEGIN')
+            connection.executemany(
+                """
+                INSERT INTO courses (account, code, name, url, position, mtime)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (account, code) DO UPDATE SET
+                    name = excluded.name, url = excluded.url,
+                    position = excluded.position, mtime = excluded.mtime
+                """,
+                [
+                    (account, course['code'] or course['url'], course['name'], course['url'], position, now)
+                    for position, course in enumerate(courses)
+                ],
+            )
+            connection.execute(
+                'DELETE FROM courses WHERE account = ? AND mtime < ?', (account, now)
+            )
+            connection.executemany(_UPSERT_SEARCH_DOC, [
+                ('course', c['code'], c['code'], c['name'], c['url'], fold(f"{c['name']} {c['code']}"))
+                for c in courses if c['code']
+            ])
+    
+    def courses(self, account: str) -> List[Dict[str, str]]:
+        """Return an account's indexed courses in portfolio order."""
+        rows = self._connect().execute(
+            'SELECT NULLIF(code, url) AS code, name, url FROM courses WHERE account = ? ORDER BY position',
+            (account,),
+        )
+        return [dict(row) for row in rows]
+    
+    def courses_page(self, account: str, after: int, limit: Optional[int]) -> List[Dict[str, Any]]:
+        """
+        Return up to `limit` courses following portfolio position `after`.
+        
+        Keyset pagination on (account, position), so any page costs the same
+        however deep it is. Each course carries its 'position'.
+        """
+        rows = self._connect().execute(
+            """
+            SELECT NULLIF(code, url) AS code, name, url, position FROM courses
+            WHERE account = ? AND position > ? ORDER BY position LIMIT ?
+            """,
+            (account, after, -1 if limit is None else limit),
+        )
+        return [dict(row) for row in rows]
+    
+    def course_count(self, account: str) -> int:
+        """Return how many courses are indexed for an account."""
+        return self._connect().execute(
+            'SELECT COUNT(*) FROM courses WHERE account = ?', (account,)
+        ).fetchone()[0]
+    
+    def upsert_announcements(self, course: str, announcements: List[Dict[str, str]]) -> None:
+        """Insert or update a course's announcements, keyed by id."""
+        if not announcements:
+            return
+        now = time.time()
+        connection = self._connect()
+        with connection:
+            connection.execute('BEGIN')
+            connection.executemany(
+                """
+                INSERT INTO announcements (course, id, title, date, url, mtime)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (course, id) DO UPDATE SET
+                    title = excluded.title, date = excluded.date,
+                    url = excluded.url, mtime = excluded.mtime
+                """,
+                [
+                    (course, int(a['id']), a['title'], a['date'], a['url'], now)
+                    for a in announcements
+                ],
+            )
+            connection.executemany(_UPSERT_SEARCH_DOC, [
+                ('announcement', course, a['id'], a['title'], a['url'], fold(a['title']))
+                for a in announcements
+            ])
+    
+    def last_announcement_id(self, course: str) -> int:
+        """Return the highest indexed announcement id for a course, or 0."""
+        row = self._connect().execute(
+            'SELECT MAX(id) FROM announcements WHERE course = ?', (course,)
+        ).fetchone()
+        return row[0] or 0
+    
+    def last_seen_announcement_id(self, account: str, course: str) -> int:
+        """Return the highest announcement id an account has synced for a course, or 0."""
+        row = self._connect().execute(
+            'SELECT last_id FROM announcement_sync WHERE account = ? AND course = ?', (account, course)
+        ).fetchone()
+        return row[0] if row else 0
+    
+    def mark_announcements_seen(self, account: str, course: str, last_id: int) -> None:
+        """Record that an account has synced a course's announcements up to `last_id`."""
+        connection = self._connect()
+        with connection:
+            connection.execute(
+                """
+                INSERT INTO announcement_sync (account, course, last_id, mtime) VALUES (?, ?, ?, ?)
+                ON CONFLICT (account, course) DO UPDATE SET
+                    last_id = MAX(last_id, excluded.last_id), mtime = excluded.mtime
+                """,
+                (account, course, last_id, time.time()),
+            )
+    
+    def announcements_after(self, course: str, after: int) -> List[Dict[str, str]]:
+        """Return a course's stored announcements with ids above `after`, newest first."""
+        rows = self._connect().execute(
+            """
+            SELECT id, title, date, url FROM announcements
+            WHERE course = ? AND id > ? ORDER BY id DESC
+            """,
+            (course, after),
+        )
+        return [_announcement(row) for row in rows]
+    
+    def latest_announcements(self, course: str, limit: int) -> List[Dict[str, str]]:
+        """Return a course's `limit` newest announcements."""
+        rows = self._connect().execute(
+            """
+            SELECT id, title, date, url FROM announcements
+            WHERE course = ? ORDER BY id DESC LIMIT ?
+            """,
+            (course, limit),
+        )
+        return [_announcement(row) for row in rows]
+    
+    def upsert_documents(self, course: str, documents: List[Dict[str, Any]]) -> None:
+        """Insert or update a course's documents, keyed by id."""
+        if not documents:
+            return
+        now = time.time()
+        connection = self._connect()
+        with connection:
+            connection.execute('BEGIN')
+            connection.executemany(
+                """
+                INSERT INTO documents (course, id, name, url, size, modified, mtime)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (course, id) DO UPDATE SET
+                    name = excluded.name, url = excluded.url, size = excluded.size,
+                    modified = excluded.modified, mtime = excluded.mtime
+                """,
+                [
+                    (course, d['id'], d['name'], d['url'], d.get('size'), d.get('modified'), now)
+                    for d in documents
+                ],
+            )
+            connection.executemany(_UPSERT_SEARCH_DOC, [
+                ('document', course, d['id'], d['name'], d['url'], fold(d['name']))
+                for d in documents
+            ])
+    
+    def documents(self, course: str) -> List[Dict[str, Any]]:
+        """Return a course's indexed documents."""
+        rows = self._connect().execute(
+            'SELECT id, name, url, size, modified FROM documents WHERE course = ? ORDER BY name',
+            (course,),
+        )
+        return [dict(row) for row in rows]
+    
+    def url_blob(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up the cached blob for a URL.
+        
+        Returns:
+            Dict with 'hash', 'size', 'etag' and 'last_modified', or None.
+        """
+        row = self._connect().execute(
+            """
+            SELECT u.hash, b.size, u.etag, u.last_modified
+            FROM url_blobs u JOIN blobs b ON b.hash = u.hash WHERE u.url = ?
+            """,
+            (url,),
+        ).fetchone()
+        return dict(row) if row else None
+    
+    def record_blob(
+        self, url: str, digest: str, size: int, etag: Optional[str], last_modified: Optional[str]
+    ) -> None:
+        """Record a blob and map `url` to it with its HTTP validators."""
+        now = time.time()
+        connection = self._connect()
+        with connection:
+            connection.execute('BEGIN')
+            connection.execute(
+                """
+                INSERT INTO blobs (hash, size, last_used) VALUES (?, ?, ?)
+                ON CONFLICT (hash) DO UPDATE SET last_used = excluded.last_used
+                """,
+                (digest, size, now),
+            )
+            connection.execute(
+                """
+                INSERT INTO url_blobs (url, hash, etag, last_modified, mtime) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (url) DO UPDATE SET
+                    hash = excluded.hash, etag = excluded.etag,
+                    last_modified = excluded.last_modified, mtime = excluded.mtime
+                """,
+                (url, digest, etag, last_modified, now),
+            )
+    
+    def touch_blob(self, digest: str) -> None:
+        """Mark a blob as just used, for LRU eviction."""
+        connection = self._connect()
+        with connection:
+            connection.execute('UPDATE blobs SET last_used = ? WHERE hash = ?', (time.time(), digest))
+    
+    def blobs_to_evict(self, max_bytes: int) -> List[str]:
+        """Return least-recently-used blob hashes to drop to fit in `max_bytes`."""
+        rows = self._connect().execute(
+            'SELECT hash, size FROM blobs ORDER BY last_used DESC'
+        ).fetchall()
+        total = 0
+        evict = []
+        for row in rows:
+            total += row['size']
+            if total > max_bytes:
+                evict.append(row['hash'])
+        return evict
+    
+    def forget_blob(self, digest: str) -> None:
+        """Remove a blob and every URL mapped to it."""
+        connection = self._connect()
+        with connection:
+            connection.execute('BEGIN')
+            connection.execute('DELETE FROM url_blobs WHERE hash = ?', (digest,))
+            connection.execute('DELETE FROM blobs WHERE hash = ?', (digest,))
+    
+    def search(self, account: str, query: str, limit: int = 10) -> List[Dict[str, str]]:
+        """
+        Search course names, announcements and document names.
+        
+        Every word of the query must match, as a prefix with FTS5 or as a
+        substring with the LIKE fallback. Only the account's courses are
+        searched.
+        
+        Returns:
+            Hits, best first, with 'kind', 'title', 'url', 'course',
+            'course_name' and 'course_url' keys.
+        """
+        words = _WORD.findall(fold(query))
+        if not words:
+            return []
+        
+        select = """
+            SELECT d.kind, d.title, d.url, d.course,
+                   c.name AS course_name, c.url AS course_url
+            FROM search_docs d
+            JOIN courses c ON c.code = d.course AND c.account = ?
+        """
+        if self.fts:
+            match = ' '.join(f'"{word}"*' for word in words)
+            sql = f"""{select}
+                JOIN search_fts ON search_fts.rowid = d.rowid
+                WHERE search_fts MATCH ? ORDER BY bm25(search_fts) LIMIT ?"""
+            params: List[Any] = [account, match, limit]
+        else:
+            conditions = ' AND '.join("d.text LIKE ? ESCAPE '\\'" for _ in words)
+            sql = f"{select} WHERE {conditions} ORDER BY d.rowid DESC LIMIT ?"
+            params = [account, *(f"%{_escape_like(word)}%" for word in words), limit]
+        
+        return [dict(row) for row in self._connect().execute(sql, params)]
+
+
+def _escape_like(text: str) -> str:
+    """Escape LIKE wildcards in `text`."""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _announcement(row: sqlite3.Row) -> Dict[str, str]:
+    """Convert an announcements row to the dict shape used by the parsers."""
+    announcement = dict(row)
+    announcement['id'] = str(announcement['id'])
+    return announcement
+
+
+_stores: Dict[str, Store] = {}
+_stores_lock = threading.Lock()
+
+
+def open_store(data_dir: str, base_url: str) -> Store:
+    """Return the shared index for the eClass instance at `base_url`."""
+    instance_key = hashlib.sha256(base_url.encode('utf-8')).hexdigest()[:16]
+    path = os.path.join(data_dir, f"index-{instance_key}.sqlite3")
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = Store(path)
+        return _stores[path]
+
+
+def for_session(session_state: SessionState) -> Optional[Store]:
+    """
+    Return the index for a session's eClass instance.
+    
+    Returns:
+        The Store, or None if the database cannot be opened (the index is
+        then skipped and tools work from the network alone).
+    """
+    try:
+        return open_store(session_state.data_dir, session_state.base_url)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"Local index unavailable: {e}")
+        return None
@@ -0,0 +1,217 @@
+"""
+Structured tool output for eClass MCP Server.
+
+With ECLASS_STRUCTURED_OUTPUT enabled, every tool declares an `outputSchema`
+and returns its result as MCP `structuredContent`. The text content carries
+the same object as compact JSON instead of the human-readable summary, so
+agents read fields directly rather than re-parsing prose. To keep payloads
+small, empty fields are omitted and eClass URLs are given relative to the
+`base` field (tools that take a URL accept the relative form).
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+import mcp.types as types
+
+# Fields a course listing can include; the default matches the classic
+# listing. Kept here rather than in course_management so `tools/list` can
+# build the get_courses schema without importing the HTTP stack.
+COURSE_FIELDS = ('name', 'url', 'code')
+DEFAULT_COURSE_FIELDS = ('name', 'url')
+
+# Upper bound on courses per page
+MAX_PAGE_SIZE = 500
+
+_STRING = {"type": "string"}
+_INTEGER = {"type": "integer"}
+
+
+def enabled() -> bool:
+    """Return True if tools should return structured output."""
+    return os.getenv('ECLASS_STRUCTURED_OUTPUT', 'false').lower() in ('1', 'true', 'yes')
+
+
+def _array(**properties: Any) -> Dict[str, Any]:
+    """Schema of an array of objects with `properties`."""
+    return {"type": "array", "items": {"type": "object", "properties": properties}}
+
+
+def _schema(**properties: Any) -> Dict[str, Any]:
+    """Output schema: `ok`, an `error` message on failure, plus `properties`."""
+    return {
+        "type": "object",
+        "properties": {
+            "ok": {"type": "boolean"},
+            "error": _STRING,
+            "base": {"type": "string", "description": "eClass base URL that relative URLs resolve against"},
+            **properties,
+        },
+        "required": ["ok"],
+    }
+
+
+OUTPUT_SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "login": _schema(user=_STRING),
+    "get_courses": _schema(
+        courses=_array(code=_STRING, name=_STRING, url=_STRING),
+        total=_INTEGER,
+        next_cursor={"type": "string", "description": "Pass as cursor to get the next page"},
+    ),
+    "get_announcements": _schema(
+        courses=_array(
+            code=_STRING,
+            name=_STRING,
+            new=_INTEGER,
+            error=_STRING,
+            items=_array(id=_INTEGER, title=_STRING, date=_STRING, url=_STRING),
+        ),
+    ),
+    "search": _schema(
+        hits=_array(
+            kind={"type": "string", "enum": ["course", "announcement", "document"]},
+            title=_STRING,
+            url=_STRING,
+            course=_STRING,
+        ),
+    ),
+    "download_document": _schema(
+        path=_STRING, name=_STRING, url=_STRING, size=_INTEGER, mime=_STRING,
+    ),
+    "logout": _schema(user=_STRING),
+    "authstatus": _schema(
+        status={"type": "string", "enum": ["logged_in", "not_logged_in", "expired"]},
+        user=_STRING,
+    ),
+}
+
+
+def to_text(data: Dict[str, Any]) -> types.TextContent:
+    """Serialize structured output as compact JSON text content."""
+    return types.TextContent(
+        type="text",
+        text=json.dumps(data, ensure_ascii=False, separators=(',', ':')),
+    )
+
+
+def _compact(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop empty and None fields."""
+    return {key: value for key, value in item.items() if value not in (None, '', [])}
+
+
+def _relative(url: str, base_url: str) -> str:
+    """Strip `base_url` from an eClass URL; other URLs are returned unchanged."""
+    if url.startswith(f"{base_url}/"):
+        return url[len(base_url):]
+    return url
+
+
+def error(message: Optional[str]) -> Dict[str, Any]:
+    """Structured form of a failed call."""
+    return {"ok": False, "error": message or "Unknown error"}
+
+
+def login(success: bool, message: Optional[str], username: Optional[str]) -> Dict[str, Any]:
+    """Structured form of a `login` result."""
+    if not success:
+        return error(message)
+    return _compact({"ok": True, "user": username})
+
+
+def courses(
+    success: bool,
+    message: Optional[str],
+    page: Optional[Dict[str, Any]],
+    fields: Sequence[str],
+    base_url: str,
+) -> Dict[str, Any]:
+    """Structured form of a page of `get_courses`, limited to `fields`."""
+    if not success:
+        return error(message)
+    items = []
+    for course in page['courses']:
+        item = {
+            "code": course['code'],
+            "name": course['name'],
+            "url": _relative(course['url'], base_url),
+        }
+        items.append(_compact({key: item[key] for key in fields}))
+    result: Dict[str, Any] = {"ok": True}
+    if 'url' in fields:
+        result["base"] = base_url
+    result.update(courses=items, total=page['total'])
+    if page['next_cursor']:
+        result["next_cursor"] = page['next_cursor']
+    return result
+
+
+def announcements(
+    success: bool, message: Optional[str], results: Optional[List[Dict[str, Any]]], base_url: str
+) -> Dict[str, Any]:
+    """Structured form of a `get_announcements` result."""
+    if not success:
+        return error(message)
+    return {"ok": True, "base": base_url, "courses": [
+        _compact({
+            "code": result['code'],
+            "name": result['name'],
+            "new": result['new'],
+            "error": result['error'],
+            "items": [
+                _compact({
+                    "id": int(a['id']),
+                    "title": a['title'],
+                    "date": a.get('date'),
+                    "url": _relative(a['url'], base_url),
+                })
+                for a in result['announcements']
+            ],
+        })
+        for result in results
+    ]}
+
+
+def search(
+    success: bool, message: Optional[str], hits: Optional[List[Dict[str, str]]], base_url: str
+) -> Dict[str, Any]:
+    """Structured form of a `search` result; `course` is the course code."""
+    if not success:
+        return error(message)
+    return {"ok": True, "base": base_url, "hits": [
+        _compact({
+            "kind": hit['kind'],
+            "title": hit['title'],
+            "url": _relative(hit['url'], base_url),
+            "course": hit['course'] if hit['kind'] != 'course' else None,
+        })
+        for hit in hits
+    ]}
+
+
+def document(
+    success: bool, message: Optional[str], document: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Structured form of a `download_document` result."""
+    if not success:
+        return error(message)
+    return {
+        "ok": True,
+        "path": document['path'],
+        "name": document['name'],
+        "url": document['url'],
+        "size": document['size'],
+        "mime": document['mime_type'],
+    }
+
+
+def logout(success: bool, username_or_error: Optional[str]) -> Dict[str, Any]:
+    """Structured form of a `logout` result; `user` is omitted if nobody was logged in."""
+    if not success:
+        return error(username_or_error)
+    return _compact({"ok": True, "user": username_or_error})
+
+
+def authstatus(status: str, username: Optional[str]) -> Dict[str, Any]:
+    """Structured form of an `authstatus` result."""
+    return _compact({"ok": True, "status": status, "user": username if status == 'logged_in' else None})
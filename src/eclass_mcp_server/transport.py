@@ -0,0 +1,324 @@
+"""
+HTTP transport for eClass MCP Server.
+
+Builds the `requests` transport adapter that sessions mount. The adapter owns
+the connection pools, so sessions keep it across logout and re-login and
+repeated requests to the eClass and SSO hosts reuse warm connections instead
+of paying for TCP and TLS setup again. Pooled connections enable TCP
+keep-alive, so idle connections dropped by a NAT or firewall are noticed
+instead of hanging the next request.
+
+Transient failures are retried inside the adapter: idempotent requests that
+fail to connect, fail while reading or get a 429/502/503/504 (as the
+university load balancer returns during restarts) are retried a few times
+with jittered exponential backoff, honoring Retry-After. Requests that could
+have reached the server are never retried for other methods, so login form
+POSTs are only retried when the connection could not be opened.
+
+Requests are also governed per host, across every session in the process: a
+token bucket caps the request rate and a semaphore the requests in flight,
+so a multi-user deployment cannot hammer eClass into throttling it. Every
+attempt of a retried request takes its own token, and the slot is given up
+while backing off.
+"""
+
+import contextlib
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests.adapters
+from urllib3.connection import HTTPConnection
+from urllib3.exceptions import MaxRetryError
+from urllib3.util.retry import Retry
+
+from . import metrics
+
+logger = logging.getLogger('eclass_mcp_server.transport')
+
+metrics.describe('eclass_http_retries_total', "Retried HTTP requests by host and reason (connect, read, status)")
+metrics.describe('eclass_http_retries_exhausted_total', "HTTP requests that failed after all retries")
+metrics.describe('eclass_http_queue_seconds', "Time HTTP requests waited for the per-host rate and concurrency limits")
+
+# Statuses worth retrying: rate limiting and gateway errors
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+# Host and governor of the request `GovernedAdapter.send` is sending on this
+# thread, so `RetryPolicy.sleep` can hand its slot back while backing off
+_sending = threading.local()
+
+
+def socket_options(keepalive: int) -> List[Tuple[int, int, int]]:
+    """
+    Return socket options for pooled connections.
+    
+    Args:
+        keepalive: Idle seconds before TCP keep-alive probes start; 0 keeps
+            the system defaults (no keep-alive).
+    """
+    options = list(HTTPConnection.default_socket_options)
+    if keepalive <= 0:
+        return options
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    # Probe timing is platform specific (TCP_KEEPALIVE is macOS' TCP_KEEPIDLE)
+    idle = getattr(socket, 'TCP_KEEPIDLE', getattr(socket, 'TCP_KEEPALIVE', None))
+    for name, value in ((idle, keepalive), (getattr(socket, 'TCP_KEEPINTVL', None), 10),
+                        (getattr(socket, 'TCP_KEEPCNT', None), 3)):
+        if name is not None:
+            options.append((socket.IPPROTO_TCP, name, value))
+    return options
+
+
+class RetryPolicy(Retry):
+    """
+    urllib3 `Retry` with full-jitter backoff, a cap on Retry-After and
+    retry counts reported to metrics.
+    """
+    
+    def get_backoff_time(self) -> float:
+        """Sleep uniformly up to `backoff_factor * 2**(retries - 1)`, at most `backoff_max`."""
+        if not self.history:
+            return 0
+        ceiling = min(self.backoff_max, self.backoff_factor * 2 ** (len(self.history) - 1))
+        return random.uniform(0, ceiling)
+    
+    def get_retry_after(self, response: Any) -> Optional[float]:
+        """Honor Retry-After, but never wait longer than `backoff_max`."""
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, self.backoff_max)
+    
+    def sleep(self, response: Any = None) -> None:
+        """Back off without holding the host's request slot, then queue again for the next attempt."""
+        current = getattr(_sending, 'governor', None)
+        if current is None:
+            super().sleep(response)
+            return
+        host, host_governor = current
+        host_governor.release()
+        try:
+            super().sleep(response)
+        finally:
+            waited = host_governor.acquire()
+            metrics.observe('eclass_http_queue_seconds', waited, host=host)
+    
+    def increment(self, method: Optional[str] = None, url: Optional[str] = None,
+                  response: Any = None, error: Optional[Exception] = None,
+                  _pool: Any = None, _stacktrace: Any = None) -> 'RetryPolicy':
+        if error is not None and self._is_connection_error(error):
+            reason = 'connect'
+        elif error is not None and self._is_read_error(error):
+            reason = 'read'
+        elif response is not None and error is None:
+            reason = 'status'
+        else:
+            reason = 'other'
+        host = getattr(_pool, 'host', None) or ''
+        try:
+            new_retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        except MaxRetryError:
+            metrics.increment('eclass_http_retries_exhausted_total', host=host, reason=reason)
+            raise
+        metrics.increment('eclass_http_retries_total', host=host, reason=reason)
+        logger.info(f"Retrying {method} {host}{url or ''} ({reason}, attempt {len(new_retry.history)})")
+        return new_retry
+
+
+def retry_policy() -> RetryPolicy:
+    """
+    Build the retry policy from the environment.
+    
+    ECLASS_RETRIES caps retries per request (0 disables them),
+    ECLASS_RETRY_BACKOFF is the backoff factor in seconds and
+    ECLASS_RETRY_MAX_WAIT caps any single wait, including Retry-After.
+    """
+    retries = int(os.getenv('ECLASS_RETRIES', '3'))
+    return RetryPolicy(
+        total=retries,
+        redirect=False,
+        allowed_methods=frozenset({'GET', 'HEAD'}),
+        status_forcelist=RETRY_STATUSES,
+        backoff_factor=float(os.getenv('ECLASS_RETRY_BACKOFF', '0.25')),
+        backoff_max=float(os.getenv('ECLASS_RETRY_MAX_WAIT', '10')),
+        # Give the caller the last error response rather than an exception,
+        # so it is reported like any other HTTP error
+        raise_on_status=False,
+    )
+
+
+class KeepAliveAdapter(requests.adapters.HTTPAdapter):
+    """
+    `HTTPAdapter` whose pooled connections use `socket_options`, with a
+    default timeout for requests that set none.
+    """
+    
+    __attrs__ = requests.adapters.HTTPAdapter.__attrs__ + ['socket_options', 'timeout']
+    
+    def __init__(self, keepalive: int = 60, timeout: Optional[float] = None, **kwargs: Any) -> None:
+        # Set before the base class builds the pool manager
+        self.socket_options = socket_options(keepalive)
+        self.timeout = timeout
+        super().__init__(**kwargs)
+    
+    def send(self, request: requests.PreparedRequest, *args: Any, **kwargs: Any) -> requests.Response:
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, *args, **kwargs)
+    
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        kwargs['socket_options'] = self.socket_options
+        super().init_poolmanager(*args, **kwargs)
+    
+    def proxy_manager_for(self, proxy: str, **proxy_kwargs: Any) -> Any:
+        proxy_kwargs['socket_options'] = self.socket_options
+        return super().proxy_manager_for(proxy, **proxy_kwargs)
+
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second, holding at most `burst`."""
+    
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> float:
+        """
+        Take one token, sleeping until it is available.
+        
+        Tokens are reserved under the lock and waited for outside it, so
+        callers are served in arrival order without polling.
+        
+        Returns:
+            Seconds slept.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class HostGovernor:
+    """Request rate and concurrency limits for one host."""
+    
+    def __init__(self, rate: float, burst: int, concurrency: int) -> None:
+        """
+        Args:
+            rate: Requests per second; 0 for no rate limit.
+            burst: Requests allowed at once before `rate` applies.
+            concurrency: Requests in flight at most; 0 for no limit.
+        """
+        self.bucket = TokenBucket(rate, max(burst, 1)) if rate > 0 else None
+        self.slots = threading.BoundedSemaphore(concurrency) if concurrency > 0 else None
+    
+    def acquire(self) -> float:
+        """
+        Take a request slot, then a token.
+        
+        Returns:
+            Seconds waited.
+        """
+        start = time.monotonic()
+        if self.slots is not None:
+            self.slots.acquire()
+        if self.bucket is not None:
+            self.bucket.acquire()
+        return time.monotonic() - start
+    
+    def release(self) -> None:
+        """Give back the request slot taken by `acquire()`."""
+        if self.slots is not None:
+            self.slots.release()
+    
+    @contextlib.contextmanager
+    def limit(self) -> Iterator[float]:
+        """Hold a request slot and a token for the block; yields the seconds waited."""
+        waited = self.acquire()
+        try:
+            yield waited
+        finally:
+            self.release()
+
+
+_governors: Dict[str, HostGovernor] = {}
+_governors_lock = threading.Lock()
+
+
+def governor(host: str) -> HostGovernor:
+    """
+    Return the process-wide governor for `host`, creating it on first use.
+    
+    ECLASS_HOST_RATE is the requests per second allowed to each host (0, the
+    default, disables rate limiting), ECLASS_HOST_BURST how many may start
+    at once before the rate applies and ECLASS_HOST_CONCURRENCY the requests
+    in flight per host (0 disables the limit).
+    """
+    with _governors_lock:
+        if host not in _governors:
+            rate = float(os.getenv('ECLASS_HOST_RATE', '0'))
+            burst = int(os.getenv('ECLASS_HOST_BURST', '10'))
+            concurrency = int(os.getenv('ECLASS_HOST_CONCURRENCY', '16'))
+            _governors[host] = HostGovernor(rate, burst, concurrency)
+            logger.debug(f"Governing {host}: {rate:g} req/s (burst {burst}), {concurrency} in flight")
+        return _governors[host]
+
+
+class GovernedAdapter(KeepAliveAdapter):
+    """
+    `KeepAliveAdapter` that sends each request under its host's governor.
+    
+    The slot is held until the response headers arrive; a streamed body is
+    read after it is released. Retries run inside `send`, so `RetryPolicy`
+    releases the slot while backing off and takes a new slot and token for
+    each further attempt.
+    """
+    
+    def send(self, request: requests.PreparedRequest, *args: Any, **kwargs: Any) -> requests.Response:
+        host = urlparse(request.url).netloc
+        host_governor = governor(host)
+        with host_governor.limit() as waited:
+            metrics.observe('eclass_http_queue_seconds', waited, host=host)
+            _sending.governor = (host, host_governor)
+            try:
+                return super().send(request, *args, **kwargs)
+            finally:
+                _sending.governor = None
+
+
+def new_adapter() -> GovernedAdapter:
+    """
+    Create a transport adapter configured from the environment.
+    
+    ECLASS_POOL_CONNECTIONS is the number of hosts to keep pools for,
+    ECLASS_POOL_MAXSIZE the pooled connections per host and
+    ECLASS_TCP_KEEPALIVE the idle seconds before keep-alive probes (0
+    disables them). ECLASS_HTTP_TIMEOUT is the connect and read timeout in
+    seconds for requests that set none (0 waits forever). Retries follow
+    `retry_policy()` and every request is subject to its host's
+    `governor()`.
+    """
+    pool_connections = int(os.getenv('ECLASS_POOL_CONNECTIONS', '4'))
+    pool_maxsize = int(os.getenv('ECLASS_POOL_MAXSIZE', '32'))
+    keepalive = int(os.getenv('ECLASS_TCP_KEEPALIVE', '60'))
+    timeout = float(os.getenv('ECLASS_HTTP_TIMEOUT', '30')) or None
+    logger.debug(
+        f"Transport: {pool_connections} host pools of {pool_maxsize} connections, keep-alive {keepalive}s"
+    )
+    return GovernedAdapter(
+        keepalive=keepalive,
+        timeout=timeout,
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retry_policy(),
+    )